@@ -0,0 +1,84 @@
+import os
+
+# Har bir yangi ulanishda bajariladi. WAL o'quvchilar va bitta yozuvchini bir-birini
+# to'smasdan ishlatadi, busy_timeout esa "database is locked" o'rniga navbat kutadi.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def sqlite_database(path, tuned=True):
+    database = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+    }
+    if tuned:
+        database['OPTIONS'] = {
+            'init_command': ''.join(f"PRAGMA {name}={value};" for name, value in SQLITE_PRAGMAS.items()),
+            # BEGIN IMMEDIATE: yozuvchi lock'ni tranzaksiya boshida oladi, o'rtada
+            # SQLITE_BUSY bilan yiqilmaydi
+            'transaction_mode': 'IMMEDIATE',
+        }
+    return database
+
+
+def postgres_database():
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB', 'yodol'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if env_bool('POSTGRES_POOL', False):
+        # psycopg pool (Django 5.1+) CONN_MAX_AGE bilan birga ishlamaydi
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', 10)),
+                'timeout': int(os.getenv('POSTGRES_POOL_TIMEOUT', 10)),
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.getenv('CONN_MAX_AGE', 60))
+    return database
+
+
+def replica_database(primary, location):
+    # sqlite uchun fayl yo'li, postgres uchun host[:port]
+    replica = dict(primary, OPTIONS=dict(primary.get('OPTIONS', {})), TEST={'MIRROR': 'default'})
+    if primary['ENGINE'].endswith('sqlite3'):
+        replica['NAME'] = location
+    else:
+        host, _, port = location.partition(':')
+        replica['HOST'] = host
+        replica['PORT'] = port or primary['PORT']
+    return replica
+
+
+def get_databases(base_dir):
+    engine = os.getenv('DATABASE_ENGINE', 'sqlite')
+    if engine == 'postgres':
+        default = postgres_database()
+    elif engine == 'sqlite':
+        default = sqlite_database(os.getenv('SQLITE_PATH', base_dir / 'db.sqlite3'), env_bool('SQLITE_TUNED', True))
+    else:
+        raise ValueError(f"DATABASE_ENGINE faqat sqlite yoki postgres bo'lishi mumkin: {engine}")
+
+    databases = {'default': default}
+    replicas = [location.strip() for location in os.getenv('DATABASE_REPLICAS', '').split(',') if location.strip()]
+    for number, location in enumerate(replicas, start=1):
+        databases[f'replica{number}'] = replica_database(default, location)
+    return databases
@@ -15,6 +15,8 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from .database import get_databases
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,17 +58,28 @@ REST_FRAMEWORK ={
         'rest_framework.permissions.IsAuthenticatedOrReadOnly'
 	],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
 
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'users.hashers.TunableArgon2PasswordHasher',
 ]
 
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 102400))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 8))
+
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASHING_TIMEOUT = float(os.getenv("PASSWORD_HASHING_TIMEOUT", 10))
+# ishlayotganlardan tashqari navbatda kutishi mumkin bo'lgan xesh ishlari, undan ortig'i 503 oladi
+PASSWORD_HASHING_QUEUE = int(os.getenv("PASSWORD_HASHING_QUEUE", 4 * PASSWORD_HASHING_WORKERS))
+
 MIDDLEWARE = [
+    'utils.middleware.PerformanceMiddleware',
+    'utils.middleware.PrimaryPinningMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -78,6 +91,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Server-Timing header'lari va /metrics (Prometheus). O'chiq bo'lsa middleware umuman yuklanmaydi
+PERFORMANCE_METRICS = os.getenv("PERFORMANCE_METRICS", "false").lower() in ("1", "true", "yes")
+# Bir nechta worker process'da metrikalar shu papka orqali jamlanadi (entrypoint.sh har startda tozalaydi).
+# Bo'sh bo'lsa har process faqat o'zinikini ko'rsatadi
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+# /metrics faqat staff foydalanuvchilarga yoki shu manzillardan (Prometheus) ochiq.
+# Proxy orqasida REMOTE_ADDR proxy manzili bo'ladi, shuning uchun scrape worker portiga to'g'ridan-to'g'ri boradi
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1").split(",") if ip.strip()]
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -96,21 +118,51 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# wsgi: gunicorn sync worker'lari, asgi: uvicorn + users API ning async view'lari
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+USERS_ASYNC_VIEWS = os.getenv("USERS_ASYNC_VIEWS", str(SERVER_MODE == "asgi")).lower() in ("1", "true", "yes")
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# DATABASE_ENGINE=sqlite (default, WAL bilan) yoki postgres, qarang config/database.py
+DATABASES = get_databases(BASE_DIR)
+# DATABASE_REPLICAS=host1,host2 (sqlite'da fayl yo'llari) berilsa xavfsiz o'qishlar replikalarga
+# yuboriladi, yozgan foydalanuvchi REPLICA_PIN_SECONDS davomida primary'dan o'qiydi (brauzerda
+# cookie, token bilan ishlaydigan klientlarda umumiy cache'dagi user id bo'yicha pin)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['utils.routers.PrimaryReplicaRouter'] if DATABASE_REPLICAS else []
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
 
 AUTH_USER_MODEL = 'users.User'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL")
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # qora ro'yxatdagi JTI'lar ham shu yerda, default 300 ta chegara ularni siqib chiqarardi
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,6 +194,11 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# tekshirilmagan vaqtinchalik fayllar MEDIA_ROOT dan tashqarida turadi (media route ularni bermaydi)
+PROFILE_PICTURE_UPLOAD_DIR = BASE_DIR / 'uploads'
+PROFILE_PICTURE_SIZES = [64, 256, 512]
+PROFILE_PICTURE_QUALITY = 82
+
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # Default primary key field type
@@ -151,6 +208,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 60 * 60))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),  # Access tokenni 1 kunga qisqartirish
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),  # Refresh tokenni 30 kun
@@ -162,8 +223,16 @@ SIMPLE_JWT = {
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_REFRESH_SERIALIZER": "users.tokens.TokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "users.tokens.TokenBlacklistSerializer",
 }
 
+JWT_BLACKLIST_WRITE_BEHIND = os.getenv("JWT_BLACKLIST_WRITE_BEHIND", "1") == "1"
+JWT_FLUSH_BATCH_SIZE = int(os.getenv("JWT_FLUSH_BATCH_SIZE", 1000))
+# Qora ro'yxat cache'i jadvaldan qanchada bir qayta yuklanadi (soniya). Process'lar o'rtasida
+# umumiy bo'lmagan cache'da (LocMem) boshqa process'dagi logout shu vaqtgacha kechikishi mumkin
+JWT_BLACKLIST_WARM_TTL = int(os.getenv("JWT_BLACKLIST_WARM_TTL", 60))
+
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
@@ -172,8 +241,51 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 
-CELERY_BROKER_URL = "redis://redis:6379/0"
-CELERY_RESULT_BACKEND = "redis://redis:6379/0"
+NOTIFICATION_BACKENDS = {
+    "Email": "users.notifications.EmailBackend",
+    "Phone": "users.notifications.SmsBackend",
+}
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", 50))
+# (user, confirmation) bo'yicha takroriy navbatga qo'yishni shu oynada yig'adi
+VERIFY_SEND_DEDUPE_WINDOW = int(os.getenv("VERIFY_SEND_DEDUPE_WINDOW", 60))
+VERIFY_SEND_SENT_TTL = int(os.getenv("VERIFY_SEND_SENT_TTL", 60 * 60))
+# tasdiqlash kodi xeshi cache'da kod muddati + shuncha soniya turadi
+VERIFY_CODE_GRACE = int(os.getenv("VERIFY_CODE_GRACE", 60))
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
+
+# Tasdiqlash xabarlari o'z navbatida, alohida worker (threads pool) ularni kutib turadi,
+# boshqa task'lar (purge, token yozuvlari, rasm) ularning orqasida turib qolmaydi
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "users.tasks.send_verify_code": {"queue": "notifications"},
+    "users.tasks.send_verify_codes": {"queue": "notifications"},
+    "users.tasks.send_verify_email": {"queue": "notifications"},
+}
+# worker'lar --pool/--concurrency bermasa shular ishlatiladi (prefork, threads, gevent, solo)
+CELERY_WORKER_POOL = os.getenv("CELERY_WORKER_POOL", "prefork")
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 0)) or None
+# acks_late bilan har bir process faqat bitta qo'shimcha xabarni oldindan oladi,
+# worker yiqilsa task navbatga qaytadi
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1))
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_TASK_SOFT_TIME_LIMIT = int(os.getenv("CELERY_TASK_SOFT_TIME_LIMIT", 60))
+CELERY_TASK_TIME_LIMIT = int(os.getenv("CELERY_TASK_TIME_LIMIT", 90))
+CELERY_BEAT_SCHEDULE = {
+    "purge-confirmations": {
+        "task": "users.tasks.purge_confirmations",
+        "schedule": timedelta(minutes=int(os.getenv("CONFIRMATION_PURGE_EVERY_MINUTES", 30))),
+    },
+    "flush-expired-tokens": {
+        "task": "users.tasks.flush_expired_tokens",
+        "schedule": timedelta(hours=int(os.getenv("JWT_FLUSH_EVERY_HOURS", 6))),
+    },
+}
+
+CONFIRMATION_RETENTION = timedelta(hours=int(os.getenv("CONFIRMATION_RETENTION_HOURS", 24)))
+CONFIRMATION_PURGE_BATCH_SIZE = int(os.getenv("CONFIRMATION_PURGE_BATCH_SIZE", 1000))
 
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
@@ -1,17 +1,33 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls import handler404
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.static import serve
 
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from users.urls import schema_urlpatterns
+from utils.metrics import registry
+
 def custom_404(request, exception):
     return render(request, '404.html', status=404)
 
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith('profile_pictures/'):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+def metrics(request):
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Yodol API",
@@ -22,7 +38,8 @@ schema_view = get_schema_view(
       license=openapi.License(name="BSD License"),
    ),
    public=True,
-   permission_classes=[permissions.AllowAny]
+   permission_classes=[permissions.AllowAny],
+   patterns=[path('users/', include(schema_urlpatterns))],
 )
 
 handler404 = custom_404
@@ -36,7 +53,9 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc')
 ]
 
+if settings.PERFORMANCE_METRICS:
+    urlpatterns += [path('metrics', metrics, name='metrics')]
 
 if settings.DEBUG:
-	urlpatterns += static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)
+	urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media)]
 	urlpatterns += static(settings.STATIC_URL, document_root = settings.STATIC_ROOT)
\ No newline at end of file
@@ -0,0 +1,52 @@
+#!/bin/sh
+# Ishlab chiqarish uchun web server.
+#
+#   SERVER_MODE=wsgi  gunicorn sync worker'lari (config.wsgi). Har bir worker bir vaqtda
+#                     bitta so'rovga xizmat qiladi, sekin SMTP/DB chaqiruvi worker'ni band qiladi.
+#   SERVER_MODE=asgi  uvicorn worker'lari (config.asgi). /users/me/ va /users/login/ async
+#                     view'larda ishlaydi (USERS_ASYNC_VIEWS), qolgan DRF view'lar thread'da.
+#
+#   WEB_CONCURRENCY   worker process'lar soni, odatda 2 * CPU + 1 (default 3)
+#   WEB_THREADS       faqat wsgi rejimida, har bir worker'dagi thread'lar soni (default 1)
+#   WEB_TIMEOUT       worker timeout, soniya (default 30)
+#   PORT              default 8000
+#   METRICS_DIR       worker'lar metrikasi jamlanadigan papka, har startda tozalanadi
+#                     (default /tmp/yodol-metrics, PERFORMANCE_METRICS yoqilganda ishlatiladi)
+#
+# Ikkala rejimni solishtirish: python manage.py loadtest http://web-wsgi:8000 http://web-asgi:8000
+set -e
+
+: "${SERVER_MODE:=wsgi}"
+: "${WEB_CONCURRENCY:=3}"
+: "${WEB_THREADS:=1}"
+: "${WEB_TIMEOUT:=30}"
+: "${PORT:=8000}"
+: "${METRICS_DIR:=/tmp/yodol-metrics}"
+export SERVER_MODE METRICS_DIR
+
+# oldingi ishga tushirishdagi worker'larning snapshot'lari counter'larga qo'shilib ketmasin
+rm -rf "$METRICS_DIR"
+mkdir -p "$METRICS_DIR"
+
+python manage.py migrate --noinput
+
+case "$SERVER_MODE" in
+    asgi)
+        exec uvicorn config.asgi:application \
+            --host 0.0.0.0 --port "$PORT" \
+            --workers "$WEB_CONCURRENCY" \
+            --timeout-keep-alive 5 \
+            --no-access-log
+        ;;
+    wsgi)
+        exec gunicorn config.wsgi:application \
+            --bind "0.0.0.0:$PORT" \
+            --workers "$WEB_CONCURRENCY" \
+            --threads "$WEB_THREADS" \
+            --timeout "$WEB_TIMEOUT"
+        ;;
+    *)
+        echo "SERVER_MODE faqat wsgi yoki asgi bo'lishi mumkin: $SERVER_MODE" >&2
+        exit 1
+        ;;
+esac
@@ -1,7 +1,51 @@
+import uuid
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from utils.paginator import EstimatedCountPaginator
+
+from .choices import AuthTypeChoice
+from .identifiers import InvalidIdentifier, classify
 from .models import User, UserConfirmation
 
+SEARCH_HELP_TEXT = "Email, telefon raqam yoki ID to'liq, username esa boshidan qidiriladi."
+
+
+def indexed_search(queryset, term, prefix=''):
+    # icontains indeksdan foydalana olmaydi, shuning uchun faqat indekslangan ustunlarda
+    # aniq (email, telefon, id) yoki prefiks (username) bo'yicha qidiriladi.
+    term = term.strip()
+    if not term:
+        return queryset
+
+    try:
+        pk = uuid.UUID(term)
+    except ValueError:
+        pass
+    else:
+        condition = Q(pk=pk)
+        if prefix:
+            condition |= Q(**{f'{prefix}pk': pk})
+        return queryset.filter(condition)
+
+    try:
+        identifier = classify(term)
+    except InvalidIdentifier:
+        pass
+    else:
+        if identifier.kind == AuthTypeChoice.Email:
+            return queryset.alias(email_lower=Lower(f'{prefix}email')).filter(email_lower=identifier.value)
+        return queryset.filter(**{f'{prefix}phone_number': identifier.value})
+
+    return queryset.filter(**{
+        f'{prefix}username__gte': term,
+        f'{prefix}username__lt': term + '\uffff',
+        f'{prefix}username__startswith': term,
+    })
+
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -9,7 +53,10 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ('auth_type', 'auth_status', 'is_staff', 'is_superuser', 'is_active')
 
     search_fields = ('username', 'email', 'phone_number')
-    ordering = ('id',)
+    search_help_text = SEARCH_HELP_TEXT
+    ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     readonly_fields = ('last_login', 'date_joined')
 
@@ -41,9 +88,23 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        return indexed_search(queryset, search_term), False
+
 @admin.register(UserConfirmation)
 class UserConfirmationAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'code', 'verify_type', 'expiration_time', 'is_used')
     list_filter = ('verify_type', 'is_used')
-    search_fields = ('user__username', 'user__email', 'code')
-    ordering = ('-id',)
+    search_fields = ('user__username', 'user__email', 'user__phone_number', 'code')
+    search_help_text = "4 xonali kod ham to'liq qidiriladi. " + SEARCH_HELP_TEXT
+    list_select_related = ('user',)
+    ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # kodning o'zi uchun indeks yo'q, shuning uchun faqat aniq moslik (icontains emas)
+        term = search_term.strip()
+        if len(term) == 4 and term.isdigit():
+            return queryset.filter(code=term), False
+        return indexed_search(queryset, search_term, prefix='user__'), False
@@ -0,0 +1,98 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from . import profile
+from .authentication import CachedJWTAuthentication
+from .models import User
+from .passwords import HashingUnavailable, averify_password
+from .tokens import issue_tokens
+
+authentication = CachedJWTAuthentication()
+
+
+async def authenticate(request):
+    try:
+        return await authentication.aauthenticate(request), None
+    except (AuthenticationFailed, InvalidToken) as e:
+        return None, JsonResponse(e.detail, status=e.status_code)
+
+
+def read_body(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@require_GET
+async def profile_info(request):
+    auth, error = await authenticate(request)
+    if error is not None:
+        return error
+    if auth is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    user = auth[0]
+    etag, last_modified = profile.profile_validators(user)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(
+            {
+                "message": "Foydalanuvchi ma'lumotlari",
+                "data": await profile.aprofile_data(user, etag)
+            }
+        )
+    return profile.set_validators(response, etag, last_modified)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    auth, error = await authenticate(request)
+    if error is not None:
+        return error
+    if auth is not None:
+        return JsonResponse(
+            {
+                "status": False,
+                "message": "User is already logged in."
+            }, status=400
+        )
+
+    data = read_body(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+
+    errors = {
+        name: ["This field is required."]
+        for name in ('login_name', 'password') if not data.get(name)
+    }
+    if errors:
+        return JsonResponse(errors, status=400)
+
+    user = await User.objects.aget_by_login_name(data['login_name'])
+    try:
+        valid = await averify_password(user, data['password'])
+    except HashingUnavailable as exc:
+        return JsonResponse({"detail": str(exc)}, status=503)
+    if not valid:
+        return JsonResponse({"non_field_errors": ["Invalid login credentials."]}, status=400)
+
+    return JsonResponse(
+        {
+            "status": True,
+            "message": "User logged in successfully",
+            "data": {
+                "token": await sync_to_async(issue_tokens)(user)
+            }
+        }, status=200
+    )
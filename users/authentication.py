@@ -0,0 +1,71 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from utils.metrics import record_cache
+from utils.routers import acacheable_read, apin_reads_for, cacheable_read, pin_reads_for
+
+from .user_cache import UserCache, bump_user_version, get_user_version, version_key
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        version = get_user_version(user_id)
+        user = user_cache.get(user_id, version)
+        record_cache('user', user is not None)
+        if user is None:
+            pin_reads_for(user_id)
+            user = super().get_user(validated_token)
+            if cacheable_read(user_id):
+                user_cache.set(user_id, version, user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        version = await cache.aget(version_key(user_id))
+        if version is None:
+            version = await sync_to_async(bump_user_version)(user_id)
+        user = user_cache.get(user_id, version)
+        record_cache('user', user is not None)
+        if user is None:
+            await apin_reads_for(user_id)
+            try:
+                user = await get_user_model().objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except get_user_model().DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            if await acacheable_read(user_id):
+                user_cache.set(user_id, version, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user, validated_token
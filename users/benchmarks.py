@@ -0,0 +1,273 @@
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import choices
+from .identifiers import InvalidIdentifier, classify
+from .loadtest import LoadResult
+from .passwords import _verify
+from .tokens import issue_tokens
+from .models import User, UserConfirmation
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - started
+    return elapsed / repeat
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}" if connection.vendor == 'sqlite' else f"EXPLAIN {sql}", params)
+        return " | ".join(str(row[-1]) for row in cursor.fetchall())
+
+
+def make_users(count, batch_size=5000):
+    created = []
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            user = User(email=f"bench{i}@example.com", auth_type=choices.AuthTypeChoice.Email)
+            user.username = str(user.id)
+            user.set_unusable_password()
+            batch.append(user)
+        created.extend(User.objects.bulk_create(batch))
+    return created
+
+
+@scenario('confirmation-lookup')
+def confirmation_lookup(stdout, rows, repeat):
+    users = make_users(max(rows // 10, 1))
+    now = timezone.now()
+    batch = []
+    for i in range(rows):
+        batch.append(UserConfirmation(
+            user=users[i % len(users)], code=str(random.randint(1000, 9999)),
+            verify_type=choices.AuthTypeChoice.Email, expiration_time=now + timedelta(minutes=5),
+            is_used=i % 3 == 0,
+        ))
+        if len(batch) == 10000:
+            UserConfirmation.objects.bulk_create(batch)
+            batch = []
+    UserConfirmation.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    target = users[len(users) // 2]
+    code = UserConfirmation.objects.filter(user=target).values_list('code', flat=True).first()
+
+    stdout.write(f"plan: {explain(UserConfirmation.objects.live().filter(user=target, code=code).order_by('-created_at'))}")
+    avg = timed(lambda: UserConfirmation.objects.latest_live(target, code), repeat)
+    stdout.write(f"latest_live: {avg * 1000:.3f} ms/lookup ({rows} confirmations)")
+
+    since = now - timedelta(minutes=1)
+    avg = timed(lambda: UserConfirmation.objects.filter(user=target, created_at__gte=since).count(), repeat)
+    stdout.write(f"recent count: {avg * 1000:.3f} ms/query")
+
+
+def legacy_classify(data):
+    if data[1:len(data)].isdigit():
+        return bool(re.match("^\\+?[1-9][0-9]{7,14}$", data))
+    elif "@" in data:
+        return bool(re.match(r"^\S+@\S+\.\S+$", data))
+    return False
+
+
+@scenario('identifiers')
+def identifiers(stdout, rows, repeat):
+    samples = ["+998901234567", "998901234567", "User@Example.COM", "+998 90 123-45-67", "not an identifier"]
+
+    def run_classify():
+        for sample in samples:
+            try:
+                classify(sample)
+            except InvalidIdentifier:
+                pass
+
+    for name, func in (('legacy re.match', lambda: [legacy_classify(s) for s in samples]), ('classify', run_classify)):
+        avg = timed(func, repeat * 100)
+        stdout.write(f"{name}: {avg / len(samples) * 1e9:.0f} ns/identifier")
+
+
+@scenario('login-lookup')
+def login_lookup(stdout, rows, repeat):
+    make_users(rows)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    for login_name in (f"BENCH{rows // 2}@example.com", str(User.objects.values_list('username', flat=True)[rows // 3])):
+        avg = timed(lambda: User.objects.get_by_login_name(login_name), repeat)
+        stdout.write(f"{login_name}: {avg * 1000:.3f} ms/lookup ({rows} users)")
+
+
+ARGON2_PARAMETER_SETS = [
+    {'ARGON2_TIME_COST': 2, 'ARGON2_MEMORY_COST': 102400, 'ARGON2_PARALLELISM': 8},
+    {'ARGON2_TIME_COST': 3, 'ARGON2_MEMORY_COST': 65536, 'ARGON2_PARALLELISM': 4},
+    {'ARGON2_TIME_COST': 2, 'ARGON2_MEMORY_COST': 19456, 'ARGON2_PARALLELISM': 1},
+    {'ARGON2_TIME_COST': 1, 'ARGON2_MEMORY_COST': 47104, 'ARGON2_PARALLELISM': 1},
+]
+
+
+@scenario('password-hashing')
+def password_hashing(stdout, rows, repeat):
+    repeat = min(repeat, 50)
+    for params in ARGON2_PARAMETER_SETS:
+        with override_settings(**params):
+            encoded = make_password("benchmark-password")
+            avg = timed(lambda: _verify("benchmark-password", encoded), repeat)
+        label = ", ".join(f"{key.removeprefix('ARGON2_').lower()}={value}" for key, value in params.items())
+        stdout.write(
+            f"{label}: {avg * 1000:.1f} ms/login, {1 / avg:.1f} login/s per caller, "
+            f"{1 / avg / params['ARGON2_PARALLELISM']:.1f} login/s per core"
+        )
+
+
+@scenario('tokens')
+def tokens(stdout, rows, repeat):
+    from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+    user = make_users(1)[0]
+
+    def legacy():
+        refresh = SimpleRefreshToken.for_user(user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    with mock.patch('users.tokens.record_outstanding_tokens.delay'):
+        for name, func in (('RefreshToken.for_user', legacy), ('issue_tokens', lambda: issue_tokens(user))):
+            avg = timed(func, repeat)
+            stdout.write(f"{name}: {avg * 1000:.3f} ms/pair, {1 / avg:.0f} pair/s")
+
+
+def describe_database():
+    if connection.vendor != 'sqlite':
+        return connection.vendor
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        journal_mode = cursor.fetchone()[0]
+    return f"sqlite journal_mode={journal_mode} transaction_mode={connection.transaction_mode or 'DEFERRED'}"
+
+
+@scenario('signup-concurrency')
+def signup_concurrency(stdout, rows, repeat, workers=8):
+    make_users(rows)
+    per_worker = max(repeat // workers, 1)
+    result = LoadResult(describe_database(), 'sign-up')
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers)
+
+    def worker(n):
+        client = APIClient()
+        latencies, errors = [], 0
+        barrier.wait()
+        try:
+            for i in range(per_worker):
+                started = time.perf_counter()
+                try:
+                    response = client.post('/users/sign-up/', {'email_or_phone': f"signup{n}-{i}@example.com"}, format='json')
+                    ok = response.status_code == 201
+                except DatabaseError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+        finally:
+            connection.close()
+        with lock:
+            result.latencies.extend(latencies)
+            result.errors += errors
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    started = time.perf_counter()
+    with mock.patch('users.models.send_verify_code.delay'), mock.patch('users.tokens.record_outstanding_tokens.delay'):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result.seconds = time.perf_counter() - started
+
+    stdout.write(
+        "{target}, {workers} oqim: {requests} yaratildi, {errors} xato, "
+        "p50 {p50_ms} ms, p99 {p99_ms} ms, {rps} signup/s".format(workers=workers, **result.as_dict())
+    )
+
+
+class SlowEmailBackend:
+    latency = 0.02
+    sent = 0
+    lock = threading.Lock()
+    done = threading.Condition(lock)
+
+    def send_batch(self, notifications):
+        time.sleep(self.latency * len(notifications))
+        with self.done:
+            SlowEmailBackend.sent += len(notifications)
+            self.done.notify_all()
+        return len(notifications)
+
+    @classmethod
+    def wait_for(cls, count, timeout):
+        with cls.done:
+            return cls.done.wait_for(lambda: cls.sent >= count, timeout)
+
+
+CELERY_POOLS = (('solo', 1), ('threads', 4), ('threads', 20))
+
+
+@scenario('celery-throughput')
+def celery_throughput(stdout, rows, repeat):
+    from celery.contrib.testing.worker import start_worker
+    from config.celery import app
+    from . import notifications
+    from .tasks import send_verify_code
+
+    repeat = min(repeat, 500)
+    # Django settings'dan kelgan CELERY_ kalitlari ustidan yoziladi
+    app.conf.update(
+        CELERY_BROKER_URL='memory://',
+        CELERY_BROKER_TRANSPORT_OPTIONS={'polling_interval': 0.01},
+        CELERY_TASK_IGNORE_RESULT=True,
+        # memory transport sinxron loop'da ishlaydi va to'lgan QoS ni faqat 2 soniyada bir
+        # qayta tekshiradi, shuning uchun bu yerda prefetch cheklanmaydi
+        CELERY_WORKER_PREFETCH_MULTIPLIER=0,
+    )
+    expires = timezone.now() + timedelta(minutes=2)
+    try:
+        with override_settings(NOTIFICATION_BACKENDS={'Email': f"{__name__}.SlowEmailBackend"}):
+            for pool, concurrency in CELERY_POOLS:
+                notifications._dispatchers.clear()
+                SlowEmailBackend.sent = 0
+                with start_worker(app, pool=pool, concurrency=concurrency, queues=['notifications'], perform_ping_check=False):
+                    started = time.perf_counter()
+                    for i in range(repeat):
+                        send_verify_code.delay("Email", f"bench{i}@example.com", "1234", expires)
+                    finished = SlowEmailBackend.wait_for(repeat, timeout=120)
+                    elapsed = time.perf_counter() - started
+                stdout.write(
+                    f"pool={pool} concurrency={concurrency}: {SlowEmailBackend.sent}/{repeat} xabar, {elapsed:.2f} s, "
+                    f"{SlowEmailBackend.sent / elapsed:.0f} xabar/s (SMTP {SlowEmailBackend.latency * 1000:.0f} ms)"
+                    + ("" if finished else ", timeout")
+                )
+    finally:
+        notifications._dispatchers.clear()
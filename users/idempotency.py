@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def send_key(user_id, confirmation_id):
+    return f"verify-send:{user_id}:{confirmation_id}"
+
+
+def claim_enqueue(key):
+    return cache.add(f"{key}:queued", 1, settings.VERIFY_SEND_DEDUPE_WINDOW)
+
+
+def is_sent(key):
+    return cache.get(f"{key}:sent") is not None
+
+
+def sent_keys(keys):
+    found = cache.get_many([f"{key}:sent" for key in keys])
+    return {key for key in keys if f"{key}:sent" in found}
+
+
+def claim_send(key):
+    # task time limit'idan uzoqroq turadi, yiqilgan worker'ning claim'i o'zi tugaydi
+    return cache.add(f"{key}:sending", 1, settings.CELERY_TASK_TIME_LIMIT)
+
+
+def release_send(key):
+    cache.delete(f"{key}:sending")
+
+
+def mark_sent(keys):
+    cache.set_many({f"{key}:sent": 1 for key in keys}, settings.VERIFY_SEND_SENT_TTL)
+    cache.delete_many([f"{key}:sending" for key in keys])
@@ -0,0 +1,38 @@
+import re
+from typing import NamedTuple
+
+from .choices import AuthTypeChoice
+
+PHONE_RE = re.compile(r"^\+?[1-9][0-9]{7,14}$")
+EMAIL_RE = re.compile(r"^\S+@\S+\.\S+$")
+PHONE_SEPARATORS = str.maketrans('', '', ' -()')
+
+
+class InvalidIdentifier(ValueError):
+    pass
+
+
+class Identifier(NamedTuple):
+    kind: str
+    value: str
+
+    @property
+    def field(self):
+        return 'email' if self.kind == AuthTypeChoice.Email else 'phone_number'
+
+
+def classify(raw):
+    value = raw.strip()
+    if "@" in value:
+        value = value.lower()
+        if not EMAIL_RE.match(value):
+            raise InvalidIdentifier("Email validatsiyadan o'tmadi")
+        return Identifier(AuthTypeChoice.Email, value)
+
+    phone = value if value[1:].isdigit() else value.translate(PHONE_SEPARATORS)
+    if phone[1:].isdigit():
+        if not PHONE_RE.match(phone):
+            raise InvalidIdentifier("Telefon raqam validatsiyadan o'ta olmadi country code bilan bo'lsin masalan: +998990327898")
+        return Identifier(AuthTypeChoice.Phone, phone if phone[0] == '+' else f"+{phone}")
+
+    raise InvalidIdentifier("Kelgan qiymat email ham telefon raqam ham emas")
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .storage import profile_picture_storage
+
+ALLOWED_FORMATS = {'JPEG', 'PNG'}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def validate_image(path):
+    try:
+        with Image.open(path) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise InvalidImage("Faqat jpg, jpeg png rasm formatlari ruxsat etilgan.")
+            image.verify()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImage("Yuklangan fayl rasm emas yoki buzilgan.")
+
+
+def store_upload(upload):
+    upload_dir = settings.PROFILE_PICTURE_UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=upload_dir, suffix='.upload', delete=False) as tmp:
+        for chunk in upload.chunks():
+            tmp.write(chunk)
+    try:
+        validate_image(tmp.name)
+    except InvalidImage:
+        os.remove(tmp.name)
+        raise
+    return tmp.name
+
+
+def render(image, size, fmt):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    if fmt == 'WEBP':
+        variant.save(buffer, 'WEBP', quality=settings.PROFILE_PICTURE_QUALITY, method=4)
+    else:
+        variant.save(buffer, 'JPEG', quality=settings.PROFILE_PICTURE_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build_variants(path):
+    validate_image(path)
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source).convert('RGBA')
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    image = background
+
+    variants = {}
+    for size in settings.PROFILE_PICTURE_SIZES:
+        variants[str(size)] = {
+            ext: profile_picture_storage.save(f"profile_pictures/{size}.{ext}", ContentFile(render(image, size, fmt)))
+            for ext, fmt in (('jpg', 'JPEG'), ('webp', 'WEBP'))
+        }
+    return variants
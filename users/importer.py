@@ -0,0 +1,151 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+
+from . import choices, verification
+from .models import User, UserConfirmation
+from .identifiers import InvalidIdentifier, classify
+from .tasks import send_verify_codes
+
+HEADER_NAMES = {'email_or_phone', 'email', 'phone', 'phone_number'}
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    created: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'read': self.read,
+            'created': self.created,
+            'invalid': self.invalid,
+            'duplicates': self.duplicates,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second),
+        }
+
+
+def decode_lines(lines, encoding='utf-8'):
+    # buzilgan qator butun importni to'xtatmaydi, None bo'lib o'tadi va invalid hisoblanadi
+    for line in lines:
+        if isinstance(line, bytes):
+            try:
+                line = line.decode(encoding)
+            except UnicodeDecodeError:
+                line = None
+        yield line
+
+
+def read_csv(lines):
+    for line in lines:
+        if line is None:
+            yield ''
+            continue
+        row = next(csv.reader([line]), [])
+        value = next((cell.strip() for cell in row if cell.strip()), None)
+        if value is None or value.lower() in HEADER_NAMES:
+            continue
+        yield value
+
+
+def read_jsonl(lines):
+    for line in lines:
+        if line is None:
+            yield ''
+            continue
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield ''
+            continue
+        if isinstance(item, str):
+            yield item.strip()
+        elif isinstance(item, dict):
+            yield str(item.get('email_or_phone') or item.get('email') or item.get('phone_number') or '').strip()
+        else:
+            yield ''
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def import_users(lines, fmt='csv', chunk_size=1000, progress=None):
+    stats = ImportStats()
+    values = READERS[fmt](decode_lines(lines))
+    while True:
+        chunk = list(islice(values, chunk_size))
+        if not chunk:
+            break
+        import_chunk(chunk, stats)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def import_chunk(values, stats):
+    emails, phones = {}, {}
+    for value in values:
+        try:
+            identifier = classify(value)
+        except InvalidIdentifier:
+            stats.invalid += 1
+            continue
+        if identifier.kind == choices.AuthTypeChoice.Email:
+            emails[identifier.value] = None
+        else:
+            phones[identifier.value] = None
+
+    existing = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+    existing.update(User.objects.filter(phone_number__in=phones).values_list('phone_number', flat=True))
+
+    users = []
+    for auth_type, identifiers in ((choices.AuthTypeChoice.Email, emails), (choices.AuthTypeChoice.Phone, phones)):
+        for value in identifiers:
+            if value in existing:
+                continue
+            if auth_type == choices.AuthTypeChoice.Email:
+                user = User(email=value, auth_type=auth_type)
+            else:
+                user = User(phone_number=value, auth_type=auth_type)
+            user.generate_username_and_password()
+            users.append(user)
+
+    confirmations = []
+    for user in users:
+        confirmation = UserConfirmation(user=user, verify_type=user.auth_type)
+        confirmation.generate_code()
+        confirmation.create_expiration()
+        confirmations.append(confirmation)
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        UserConfirmation.objects.bulk_create(confirmations)
+        payload = [
+            (c.verify_type, c.user.email or c.user.phone_number, c.code, c.expiration_time, str(c.user_id), str(c.pk))
+            for c in confirmations
+        ]
+        if payload:
+            transaction.on_commit(lambda: verification.remember_many(confirmations))
+            transaction.on_commit(lambda: send_verify_codes.delay(payload))
+
+    stats.read += len(values)
+    stats.created += len(users)
+    stats.duplicates = stats.read - stats.created - stats.invalid
@@ -0,0 +1,92 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count
+
+
+@dataclass
+class LoadResult:
+    target: str
+    endpoint: str
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    seconds: float = 0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    @property
+    def rps(self):
+        return len(self.latencies) / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'target': self.target,
+            'endpoint': self.endpoint,
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'rps': round(self.rps, 1),
+        }
+
+
+def me_request(target, token, n):
+    return urllib.request.Request(f"{target}/users/me/", headers={'Authorization': f"Bearer {token}"})
+
+
+def login_request(target, token, n):
+    body = json.dumps({'login_name': f"loadtest-{n}@example.com", 'password': 'loadtest'}).encode()
+    return urllib.request.Request(
+        f"{target}/users/login/", data=body, headers={'Content-Type': 'application/json'}, method='POST'
+    )
+
+
+# login: mavjud bo'lmagan foydalanuvchilar bilan, rate limit'ga tushmasdan qidiruv + dummy hash yo'li o'lchanadi
+ENDPOINTS = {
+    'me': (me_request, {200, 304}),
+    'login': (login_request, {400}),
+}
+
+
+def obtain_token(target, login_name, password):
+    body = json.dumps({'login_name': login_name, 'password': password}).encode()
+    request = urllib.request.Request(
+        f"{target}/users/login/", data=body, headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['data']['token']['access']
+
+
+def run(target, endpoint, requests=500, concurrency=20, token=None, timeout=30):
+    build, expected = ENDPOINTS[endpoint]
+    result = LoadResult(target, endpoint)
+    numbers = count()
+
+    def send(_):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(build(target, token, next(numbers)), timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = None
+        return time.perf_counter() - started, status in expected
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for latency, ok in executor.map(send, range(requests)):
+            if ok:
+                result.latencies.append(latency)
+            else:
+                result.errors += 1
+    result.seconds = time.perf_counter() - started
+    return result
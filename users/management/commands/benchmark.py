@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from users.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = "Vaqtinchalik test bazasida benchmark ssenariylarini ishga tushiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', nargs='?', help=", ".join(sorted(SCENARIOS)))
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        name = options['scenario']
+        if name not in SCENARIOS:
+            raise CommandError(f"Ssenariy tanlang: {', '.join(sorted(SCENARIOS))}")
+
+        if connection.vendor == 'sqlite':
+            # in-memory test bazasi parallel yozuvlar va WAL ni ko'rsatmaydi
+            connection.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            SCENARIOS[name](self.stdout, options['rows'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
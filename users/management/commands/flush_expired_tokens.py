@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.purge import flush_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan OutstandingToken (va ularning BlacklistedToken) qatorlarini bo'laklab o'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        result = flush_expired_tokens(options['batch_size'])
+        self.stdout.write(
+            f"O'chirildi: {result['deleted']} ta, {result['seconds']}s, {result['rows_per_second']} qator/s"
+        )
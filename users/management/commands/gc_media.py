@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from users.purge import collect_media_garbage
+
+
+class Command(BaseCommand):
+    help = "Hech bir foydalanuvchi ishlatmayotgan profil rasmlarini o'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600, help="Shundan yangi fayllarga tegilmaydi (sekund)")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        result = collect_media_garbage(options['min_age'], options['dry_run'])
+        self.stdout.write(
+            f"Ko'rildi: {result['scanned']}, ishlatilmoqda: {result['referenced']} "
+            f"(bir nechta joyda: {result['shared']}), o'chirildi: {result['deleted']} "
+            f"({result['freed_bytes']} bayt)"
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users.services import identifier_conflicts
+
+
+class Command(BaseCommand):
+    help = "Normallashtirilganda bir xil email yoki telefonga tushadigan akkauntlarni ko'rsatadi"
+
+    def handle(self, *args, **options):
+        conflicts = identifier_conflicts()
+        for (field, value), users in sorted(conflicts.items()):
+            self.stdout.write(f"{field}={value}")
+            for pk, username, stored, auth_status, date_joined in users:
+                self.stdout.write(f"  {pk} {username} {stored!r} {auth_status} {date_joined:%Y-%m-%d %H:%M}")
+        self.stdout.write(f"To'qnashuvlar: {len(conflicts)} ta")
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importer import READERS, import_users
+
+
+class Command(BaseCommand):
+    help = "CSV yoki JSONL fayldan foydalanuvchilarni bo'laklab import qiladi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS))
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError("Format aniqlanmadi, --format csv yoki --format jsonl bering")
+
+        def progress(stats):
+            self.stdout.write(
+                f"{stats.read} o'qildi, {stats.created} yaratildi, "
+                f"{stats.invalid} xato, {stats.duplicates} takror, {stats.rows_per_second:.0f} qator/s"
+            )
+
+        with path.open(newline='', encoding='utf-8') as lines:
+            stats = import_users(lines, fmt, options['chunk_size'], progress)
+
+        self.stdout.write(self.style.SUCCESS(f"Tugadi: {stats.as_dict()}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.loadtest import ENDPOINTS, obtain_token, run
+
+
+class Command(BaseCommand):
+    help = "Ishlab turgan server(lar)ga bir xil yuklama berib p50/p99 va RPS ni solishtiradi (masalan wsgi va asgi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', help="masalan http://localhost:8001")
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS))
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--login-name')
+        parser.add_argument('--password')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoint'] or sorted(ENDPOINTS)
+        if 'me' in endpoints and not (options['login_name'] and options['password']):
+            raise CommandError("me uchun --login-name va --password bering")
+
+        for target in options['targets']:
+            target = target.rstrip('/')
+            token = None
+            if 'me' in endpoints:
+                token = obtain_token(target, options['login_name'], options['password'])
+            for endpoint in endpoints:
+                run(target, endpoint, options['warmup'], options['concurrency'], token)
+                result = run(target, endpoint, options['requests'], options['concurrency'], token)
+                self.stdout.write(
+                    "{target} {endpoint}: {requests} so'rov, {errors} xato, "
+                    "p50 {p50_ms} ms, p99 {p99_ms} ms, {rps} rps".format(**result.as_dict())
+                )
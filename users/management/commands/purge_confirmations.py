@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.purge import purge_confirmations
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan va ishlatilgan tasdiqlash kodlarini bo'laklab o'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention', type=int, help="Saqlash muddati (sekund)")
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        result = purge_confirmations(options['retention'], options['batch_size'])
+        self.stdout.write(
+            f"O'chirildi: {result['deleted']} ta, {result['seconds']}s, {result['rows_per_second']} qator/s"
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['user', 'is_used', 'code', '-created_at'], name='confirm_user_live_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['user', 'created_at'], name='confirm_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userconfirmation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userconfirmation',
+            name='expiration_time',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+        ('users', '0004_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS "token_outstanding_expires_idx" ON "token_blacklist_outstandingtoken" ("expires_at")',
+            reverse_sql='DROP INDEX IF EXISTS "token_outstanding_expires_idx"',
+        ),
+    ]
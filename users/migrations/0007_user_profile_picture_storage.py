@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:09
+
+import django.core.validators
+import users.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=users.storage.get_profile_picture_storage, upload_to='profile_pictures/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'], message='Faqat jpg, jpeg png rasm formatlari ruxsat etilgan.')]),
+        ),
+    ]
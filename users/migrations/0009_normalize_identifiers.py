@@ -0,0 +1,54 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations
+
+# users.identifiers.classify() qoidalarining shu migratsiya uchun muzlatilgan nusxasi
+PHONE_RE = re.compile(r"^\+?[1-9][0-9]{7,14}$")
+EMAIL_RE = re.compile(r"^\S+@\S+\.\S+$")
+PHONE_SEPARATORS = str.maketrans('', '', ' -()')
+
+
+def normalize_email(value):
+    value = value.strip().lower()
+    return value if EMAIL_RE.match(value) else None
+
+
+def normalize_phone(value):
+    phone = value.strip().translate(PHONE_SEPARATORS)
+    if not PHONE_RE.match(phone):
+        return None
+    return phone if phone[0] == '+' else f"+{phone}"
+
+
+FIELDS = (('email', normalize_email), ('phone_number', normalize_phone))
+
+
+def normalize_identifiers(apps, schema_editor):
+    # Faqat to'qnashuvsiz qatorlar yangilanadi. Bir xil qiymatga tushadigan akkauntlar
+    # o'zgarishsiz qoladi, ularni `manage.py identifier_conflicts` ko'rsatadi.
+    User = apps.get_model('users', 'User')
+    for field, normalize in FIELDS:
+        targets = defaultdict(list)
+        rows = User.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).values_list('pk', field)
+        for pk, value in rows.iterator(chunk_size=2000):
+            target = normalize(value)
+            if target is not None and target != value:
+                targets[target].append(pk)
+
+        for target, pks in targets.items():
+            if len(pks) > 1 or User.objects.filter(**{field: target}).exists():
+                continue
+            User.objects.filter(pk=pks[0]).update(**{field: target})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_admin_created_indexes'),
+    ]
+
+    operations = [
+        # faqat yozilish shakli o'zgaradi (harf registri, '+', ajratgichlar), qator o'chirilmaydi
+        migrations.RunPython(normalize_identifiers, migrations.RunPython.noop),
+    ]
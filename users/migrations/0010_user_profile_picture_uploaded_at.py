@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_normalize_identifiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_uploaded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
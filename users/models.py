@@ -1,81 +1,162 @@
-from django.db import models
+from django.db import models, transaction
 from . import choices
 import random
-from .tasks import send_verify_email
+from .tasks import send_verify_code
 from datetime import timedelta
 from django.utils import timezone
 from utils.models import BaseModel
-from django.contrib.auth.models import AbstractUser
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.db.models.functions import Lower
+from .identifiers import InvalidIdentifier, classify
+from .idempotency import claim_enqueue, send_key
+from . import verification
+from .user_cache import invalidate_user
+from .storage import get_profile_picture_storage
 from django.core.validators import FileExtensionValidator
 
 nb = dict(null=True, blank=True)
 
+
+class UserManager(BaseUserManager):
+    def by_identifier(self, identifier):
+        if identifier.kind == choices.AuthTypeChoice.Email:
+            return self.alias(email_lower=Lower('email')).filter(email_lower=identifier.value)
+        return self.filter(phone_number=identifier.value)
+    
+    def login_querysets(self, login_name):
+        try:
+            identifier = classify(login_name)
+        except InvalidIdentifier:
+            identifier = None
+        
+        if identifier is not None:
+            yield self.by_identifier(identifier)[:1]
+        
+        yield self.filter(username=login_name)[:1]
+    
+    def get_by_login_name(self, login_name):
+        for queryset in self.login_querysets(login_name):
+            user = next(iter(queryset), None)
+            if user is not None:
+                return user
+        return None
+    
+    async def aget_by_login_name(self, login_name):
+        for queryset in self.login_querysets(login_name):
+            async for user in queryset:
+                return user
+        return None
+
+
+class UserConfirmationQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(is_used=False)
+
+    def latest_live(self, user, code):
+        return self.live().filter(user=user, code=code).order_by('-created_at').first()
+
+    def issue(self, user):
+        confirmation = self.create(user=user, verify_type=user.auth_type)
+        transaction.on_commit(lambda: verification.remember(confirmation))
+        transaction.on_commit(confirmation.send_verify)
+        return confirmation
+
+    def is_current(self, user_id, confirmation_id):
+        latest = self.filter(user_id=user_id).order_by('-created_at').values('pk', 'is_used', 'expiration_time').first()
+        return (
+            latest is not None
+            and str(latest['pk']) == str(confirmation_id)
+            and not latest['is_used']
+            and latest['expiration_time'] > timezone.now()
+        )
+
+    def mark_used(self, confirmation_id):
+        return self.filter(pk=confirmation_id, is_used=False).update(is_used=True, updated_at=timezone.now()) == 1
+
+    def purgeable(self, retention):
+        return self.filter(expiration_time__lt=timezone.now() - retention)
+
+
 class User(BaseModel, AbstractUser):
     phone_number = models.CharField(max_length=15, unique=True, **nb)
     first_name = models.CharField(max_length=30, **nb)
     last_name = models.CharField(max_length=30, **nb)
     birth_date = models.DateField(**nb)
     gender = models.CharField(max_length=6, choices=choices.GenderChoice.choices, **nb)
-    profile_picture = models.ImageField(upload_to='profile_pictures/', **nb, validators=[
+    profile_picture = models.ImageField(upload_to='profile_pictures/', storage=get_profile_picture_storage, **nb, validators=[
         FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'], message="Faqat jpg, jpeg png rasm formatlari ruxsat etilgan.")
     ])
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
+    profile_picture_uploaded_at = models.DateTimeField(**nb, editable=False)
     
     auth_type = models.CharField(max_length=12, choices=choices.AuthTypeChoice.choices)
     auth_status = models.CharField(max_length=15, choices=choices.AuthStatusChoice.choices, default=choices.AuthStatusChoice.New)
     
     is_premium = models.BooleanField(default=False)
     
+    objects = UserManager()
+    
     def __str__(self):
         return self.username
     
     def token(self):
-        refresh = RefreshToken.for_user(self)
-        return {
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
+        from .tokens import issue_tokens
+        return issue_tokens(self)
         
     def generate_username_and_password(self):
-        self.username = self.id
+        self.username = str(self.id)
         self.set_unusable_password()
     
-    def create_confirm(self):
+    def set_auth_type(self):
         if self.email:
             self.auth_type = choices.AuthTypeChoice.Email
         else:
             self.auth_type = choices.AuthTypeChoice.Phone
-        
-        UserConfirmation.objects.create(user=self, verify_type=self.auth_type)
+    
+    def invalidate_caches(self):
+        user_id = self.pk
+        invalidate_user(user_id)
+        transaction.on_commit(lambda: invalidate_user(user_id))
     
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        super().save(*args, **kwargs)
+        needs_setup = self._state.adding and not self.username and not self.is_superuser and not self.is_staff
+        if needs_setup:
+            self.generate_username_and_password()
+            self.set_auth_type()
         
-        if is_new:
-            if not self.is_superuser and not self.is_staff:
-                self.generate_username_and_password()
-                self.create_confirm()
+        super().save(*args, **kwargs)
+        self.invalidate_caches()
         
-                super().save(update_fields=['username', 'password', 'auth_type'])
+        if needs_setup:
+            UserConfirmation.objects.issue(self)
+    
+    def delete(self, *args, **kwargs):
+        self.invalidate_caches()
+        return super().delete(*args, **kwargs)
     
     class Meta:
         verbose_name = "Foydalanuvchi"
         verbose_name_plural = "Foydalanuvchilar"
+        indexes = [
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ]
 
 
 class UserConfirmation(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='confirmations')
     code = models.CharField(max_length=4, null=True, blank=True)
     verify_type = models.CharField(max_length=12, choices=choices.AuthTypeChoice.choices)
-    expiration_time = models.DateTimeField(null=True, blank=True)
+    expiration_time = models.DateTimeField(null=True, blank=True, db_index=True)
     is_used = models.BooleanField(default=False)
     
+    objects = UserConfirmationQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.user.username} - {self.code}"
     
     def generate_code(self):
-        self.code = random.randint(1000, 9999)
+        self.code = str(random.randint(1000, 9999))
     
     def create_expiration(self):
         if self.verify_type == choices.AuthTypeChoice.Phone:
@@ -84,26 +165,26 @@ class UserConfirmation(BaseModel):
             self.expiration_time = timezone.now() + timedelta(minutes=5)
     
     def send_verify(self):
-        print("Send verify ishlayabdi")
-        if self.user.email:
-            print("self.user.email bu to'g'ri ishladi")
-            send_verify_email.delay(self.user.email, self.code, self.expiration_time)
-            print("Bu ishladi send_verify_email.delay(self.user.email, self.code, self.expiration_time)")
-        else:
-            print(f"Hozircha telefonga yuborilmaydi faqat print qilaman: {self.user.email, self.code, self.expiration_time}")
+        if not claim_enqueue(send_key(self.user_id, self.pk)):
+            return
+        recipient = self.user.email if self.verify_type == choices.AuthTypeChoice.Email else self.user.phone_number
+        send_verify_code.delay(
+            self.verify_type, recipient, self.code, self.expiration_time,
+            user_id=str(self.user_id), confirmation_id=str(self.pk),
+        )
     
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        if is_new:
+        if self._state.adding:
             self.generate_code()
             self.create_expiration()
-            self.send_verify()
-            print("send_verify chaqirildi")
-        
-        print(f"Natija: {self.user.email} / {self.user.phone_number} / code: {self.code} / {self.expiration_time}")
         
         super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Tasdiqlash kodi"
-        verbose_name_plural = "Tasdiqlash kodlari"
\ No newline at end of file
+        verbose_name_plural = "Tasdiqlash kodlari"
+        indexes = [
+            models.Index(fields=['user', 'is_used', 'code', '-created_at'], name='confirm_user_live_code_idx'),
+            models.Index(fields=['user', 'created_at'], name='confirm_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='confirm_created_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,120 @@
+import logging
+import smtplib
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+from .idempotency import mark_sent, release_send
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    recipient: str
+    subject: str
+    body: str
+    idempotency_key: str = None
+
+
+class BaseBackend:
+    def send_batch(self, notifications):
+        raise NotImplementedError
+
+
+class EmailBackend(BaseBackend):
+    # Har worker thread'i o'z SMTP ulanishini ochiq ushlab turadi: ketma-ket kelgan bittalik
+    # task'lar ham bitta ulanishdan foydalanadi. Server uzib qo'ygan ulanish bir marta qayta ochiladi
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection()
+            connection.open()
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection, self._local.connection = getattr(self._local, 'connection', None), None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.warning("SMTP ulanishini yopib bo'lmadi", exc_info=True)
+
+    def send_batch(self, notifications):
+        for attempt in range(2):
+            connection = self.connection()
+            messages = [
+                EmailMessage(item.subject, item.body, None, [item.recipient], connection=connection)
+                for item in notifications
+            ]
+            try:
+                return connection.send_messages(messages)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+
+class SmsBackend(BaseBackend):
+    def send_batch(self, notifications):
+        for item in notifications:
+            logger.info("Hozircha telefonga yuborilmaydi: %s %s", item.recipient, item.body)
+        return len(notifications)
+
+
+class Dispatcher:
+    # Xabarlar chaqirgan task ichida darhol yuboriladi: jarayon xotirasida yuborilmagan
+    # xabar qolmaydi, xato esa task'ga qaytadi va Celery retry qiladi
+    def __init__(self, backend, batch_size=50):
+        self.backend = backend
+        self.batch_size = batch_size
+
+    def send(self, notifications):
+        sent = 0
+        for start in range(0, len(notifications), self.batch_size):
+            chunk = notifications[start:start + self.batch_size]
+            keys = [item.idempotency_key for item in chunk if item.idempotency_key]
+            try:
+                self.backend.send_batch(chunk)
+            except Exception:
+                logger.exception("%s ta xabarni yuborib bo'lmadi", len(chunk))
+                # shu va keyingi bo'laklar yuborilmadi, retry ularni qayta olishi kerak
+                for item in notifications[start:]:
+                    if item.idempotency_key:
+                        release_send(item.idempotency_key)
+                raise
+            if keys:
+                mark_sent(keys)
+            sent += len(chunk)
+        return sent
+
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(channel):
+    with _dispatchers_lock:
+        if channel not in _dispatchers:
+            backend = import_string(settings.NOTIFICATION_BACKENDS[channel])()
+            _dispatchers[channel] = Dispatcher(backend, batch_size=settings.NOTIFICATION_BATCH_SIZE)
+        return _dispatchers[channel]
+
+
+def verify_notification(recipient, code, expiration_time, idempotency_key=None):
+    return Notification(
+        recipient=recipient,
+        subject="Xush kelibsiz !",
+        body=f"Akkauntingizni aktivlashtirish uchun parol: {code}\nparol amal qilish muddati: {expiration_time} gacha",
+        idempotency_key=idempotency_key,
+    )
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+from utils.metrics import timer
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class HashingUnavailable(Exception):
+    def __init__(self, message="Server band, birozdan keyin qayta urinib ko'ring"):
+        super().__init__(message)
+
+
+def get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix='password-hash',
+            )
+            _slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE)
+        return _executor
+
+
+def submit(raw_password, user):
+    # navbat to'lsa darhol rad etiladi: kutayotgan xesh ishlari soni cheklangan bo'ladi.
+    # Slot ish tugaganda bo'shaydi, timeout bo'lgan ish ham shu vaqtgacha joy egallaydi.
+    executor, slots = get_executor(), _slots
+    if not slots.acquire(blocking=False):
+        raise HashingUnavailable
+    try:
+        future = executor.submit(_verify, raw_password, _encoded_password(user))
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _verify(raw_password, encoded):
+    if encoded is None:
+        make_password(raw_password)
+        return False
+    return check_password(raw_password, encoded)
+
+
+def _encoded_password(user):
+    if user is None or not user.has_usable_password():
+        return None
+    return user.password
+
+
+def _upgrade(user, raw_password):
+    if identify_hasher(user.password).must_update(user.password):
+        user.set_password(raw_password)
+        user.save(update_fields=['password'])
+
+
+def verify_password(user, raw_password):
+    with timer('hash'):
+        future = submit(raw_password, user)
+        try:
+            valid = future.result(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            raise HashingUnavailable
+    if valid:
+        _upgrade(user, raw_password)
+    return valid
+
+
+async def averify_password(user, raw_password):
+    with timer('hash'):
+        future = submit(raw_password, user)
+        try:
+            valid = await asyncio.wait_for(asyncio.wrap_future(future), settings.PASSWORD_HASHING_TIMEOUT)
+        except TimeoutError:
+            raise HashingUnavailable
+    if valid:
+        await sync_to_async(_upgrade)(user, raw_password)
+    return valid
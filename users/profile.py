@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, quote_etag
+
+from utils.metrics import record_cache
+
+from .serializers import UserProfileSerializer
+from .user_cache import profile_key
+
+
+def profile_validators(user):
+    return quote_etag(f"{user.pk}-{user.updated_at.timestamp()}"), int(user.updated_at.timestamp())
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def serialize_profile(user, etag):
+    data = dict(UserProfileSerializer(instance=user).data)
+    cache.set(profile_key(user.pk), (etag, data), settings.PROFILE_CACHE_TTL)
+    return data
+
+
+def profile_data(user, etag):
+    cached = cache.get(profile_key(user.pk))
+    hit = cached is not None and cached[0] == etag
+    record_cache('profile', hit)
+    if hit:
+        return cached[1]
+    return serialize_profile(user, etag)
+
+
+async def aprofile_data(user, etag):
+    cached = await cache.aget(profile_key(user.pk))
+    hit = cached is not None and cached[0] == etag
+    record_cache('profile', hit)
+    if hit:
+        return cached[1]
+    return await sync_to_async(serialize_profile)(user, etag)
@@ -0,0 +1,73 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from utils.db import delete_in_batches
+from .models import User, UserConfirmation
+from .storage import profile_picture_storage
+
+logger = logging.getLogger(__name__)
+
+
+def purge_confirmations(retention_seconds=None, batch_size=None):
+    if retention_seconds is None:
+        retention_seconds = settings.CONFIRMATION_RETENTION.total_seconds()
+    batch_size = batch_size or settings.CONFIRMATION_PURGE_BATCH_SIZE
+
+    queryset = UserConfirmation.objects.purgeable(timedelta(seconds=retention_seconds))
+    deleted, elapsed = delete_in_batches(queryset, batch_size, order_by='expiration_time')
+    rate = deleted / elapsed if elapsed else 0
+    logger.info("UserConfirmation purge: %s ta qator, %.2fs, %.0f qator/s", deleted, elapsed, rate)
+    return {'deleted': deleted, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate)}
+
+
+def flush_expired_tokens(batch_size=None):
+    batch_size = batch_size or settings.JWT_FLUSH_BATCH_SIZE
+    queryset = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+    deleted, elapsed = delete_in_batches(queryset, batch_size, order_by='expires_at')
+    rate = deleted / elapsed if elapsed else 0
+    logger.info("OutstandingToken flush: %s ta qator, %.2fs, %.0f qator/s", deleted, elapsed, rate)
+    return {'deleted': deleted, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate)}
+
+
+def profile_picture_references():
+    references = Counter()
+    rows = User.objects.values_list('profile_picture', 'profile_picture_variants')
+    for picture, variants in rows.iterator(chunk_size=2000):
+        if picture:
+            references[picture] += 1
+        for files in (variants or {}).values():
+            for name in files.values():
+                references[name] += 1
+    return references
+
+
+def collect_media_garbage(min_age_seconds=3600, dry_run=False):
+    storage = profile_picture_storage
+    references = profile_picture_references()
+    border = timezone.now() - timedelta(seconds=min_age_seconds)
+    result = {'scanned': 0, 'referenced': len(references), 'shared': 0, 'deleted': 0, 'freed_bytes': 0}
+    result['shared'] = sum(1 for count in references.values() if count > 1)
+
+    if not storage.exists('profile_pictures'):
+        return result
+
+    for name in storage.iter_files('profile_pictures'):
+        result['scanned'] += 1
+        if name in references or storage.get_modified_time(name) > border:
+            continue
+        size = storage.size(name)
+        if not dry_run:
+            # references yig'ilgandan keyin shu blob qayta saqlangan bo'lsa (mtime yangilangan) qoldiriladi
+            if storage.get_modified_time(name) > border:
+                continue
+            storage.delete(name)
+        result['deleted'] += 1
+        result['freed_bytes'] += size
+
+    logger.info("Media GC: %s", result)
+    return result
@@ -0,0 +1,70 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+
+
+class SlidingWindowLimiter:
+    def __init__(self, scope, limit, window, cache_alias='default'):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, key, bucket):
+        digest = hashlib.sha1(str(key).encode()).hexdigest()
+        return f"rl:{self.scope}:{digest}:{bucket}"
+
+    def _keys(self, key, now):
+        bucket = int(now // self.window)
+        return self._key(key, bucket), self._key(key, bucket - 1)
+
+    def _weigh(self, counts, current_key, previous_key, now):
+        weight = 1 - (now % self.window) / self.window
+        return counts.get(previous_key, 0) * weight + counts.get(current_key, 0)
+
+    def _estimate(self, key, now):
+        current_key, previous_key = self._keys(key, now)
+        counts = self.cache.get_many([current_key, previous_key])
+        return self._weigh(counts, current_key, previous_key, now), current_key
+
+    def is_limited(self, key):
+        estimate, _ = self._estimate(key, time.time())
+        return estimate >= self.limit
+
+    def _incr(self, key):
+        if self.cache.add(key, 1, timeout=self.window * 2):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout=self.window * 2)
+            return 1
+
+    def hit(self, key):
+        # avval atomik incr, keyin taqqoslash: parallel so'rovlarning har biri o'z sonini oladi,
+        # chegaradan oshganlari rad etiladi va o'z hissasini qaytaradi
+        now = time.time()
+        current_key, previous_key = self._keys(key, now)
+        count = self._incr(current_key)
+        counts = {current_key: count, previous_key: self.cache.get(previous_key, 0)}
+        if self._weigh(counts, current_key, previous_key, now) > self.limit:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                pass
+            return False
+        return True
+
+    def reset(self, key):
+        bucket = int(time.time() // self.window)
+        self.cache.delete_many([self._key(key, bucket), self._key(key, bucket - 1)])
+
+
+sign_up_limiter = SlidingWindowLimiter('sign-up', limit=3, window=60 * 60)
+new_verify_limiter = SlidingWindowLimiter('new-verify', limit=1, window=60)
+verify_limiter = SlidingWindowLimiter('verify', limit=5, window=5 * 60)
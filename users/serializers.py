@@ -1,12 +1,19 @@
-from rest_framework import serializers
-from django.db.models import Q
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 from django.utils.timezone import now
-from . import choices
+from django.db import transaction
+from . import choices, images, services, verification
+from .storage import profile_picture_storage
+from .tasks import process_profile_picture
 from .models import User, UserConfirmation
-import re
-from django.utils import timezone
-from datetime import timedelta
-from django.contrib.auth.hashers import check_password
+from .ratelimit import sign_up_limiter, verify_limiter
+from .identifiers import InvalidIdentifier, classify
+from .passwords import HashingUnavailable, verify_password
+
+
+class ServiceBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = 'service_busy'
 
 
 class SignUpSerializer(serializers.ModelSerializer):
@@ -24,47 +31,25 @@ class SignUpSerializer(serializers.ModelSerializer):
         return obj.token()
     
     def validate_email_or_phone(self, data):
-        user = User.objects.filter(Q(email=data) | Q(phone_number=data)).last()
+        try:
+            identifier = classify(data)
+        except InvalidIdentifier as exc:
+            raise serializers.ValidationError(str(exc))
+        
+        user = User.objects.by_identifier(identifier).order_by('-date_joined').first()
         if user:
             if user.auth_status != choices.AuthStatusChoice.New:
                 raise serializers.ValidationError("Bu akkaunt allaqachon mavjud")
-            
-            one_hour_ago = timezone.now() - timedelta(hours=1)
-            attempts = User.objects.filter(
-                Q(email=data) | Q(phone_number=data),
-                date_joined__gte=one_hour_ago
-            ).count()
-            
-            if attempts >= 3:
-                raise serializers.ValidationError(
-                    "1 soat ichida 3 martadan ko'proq ro'yxatdan o'tish mumkin emas"
-                )
-            
-        
-        if data[1:len(data)].isdigit():
-            if not bool(re.match("^\\+?[1-9][0-9]{7,14}$", data)):
-                raise serializers.ValidationError("Telefon raqam validatsiyadan o'ta olmadi country code bilan bo'lsin masalan: +998990327898")
-        elif "@" in data:
-            if not bool(re.match(r"^\S+@\S+\.\S+$", data)):
-                raise serializers.ValidationError("Email validatsiyadan o'tmadi")
-        else:
-            raise serializers.ValidationError("Kelgan qiymat email ham telefon raqam ham emas")
-        
-        return data
-    
-    def create(self, validated_data):
-        email_or_phone = validated_data.pop('email_or_phone', None)
         
-        if "@" in email_or_phone:
-            user = User.objects.create(
-                email=email_or_phone,
-            )
-        else:
-            user = User.objects.create(
-                phone_number=email_or_phone
+        if not sign_up_limiter.hit(identifier.value):
+            raise serializers.ValidationError(
+                "1 soat ichida 3 martadan ko'proq ro'yxatdan o'tish mumkin emas"
             )
         
-        return user
+        return identifier
+    
+    def create(self, validated_data):
+        return services.sign_up(validated_data.pop('email_or_phone'))
     
 class VerifyUserSerializer(serializers.ModelSerializer):
     code = serializers.CharField(min_length=4, max_length=4, write_only=True)
@@ -79,9 +64,18 @@ class VerifyUserSerializer(serializers.ModelSerializer):
         if user.auth_status != choices.AuthStatusChoice.New:
             raise serializers.ValidationError("Bu akkaunt allaqachon tasdiqlangan")
         
-        user_confirm = UserConfirmation.objects.filter(
-            user = user, code = code, is_used = False
-        ).last()
+        if not verify_limiter.hit(user.pk):
+            raise serializers.ValidationError("Juda ko'p urinish bo'ldi, 5 minutdan keyin qayta urinib ko'ring")
+        
+        result = verification.check(user.pk, code)
+        if result == verification.WRONG:
+            raise serializers.ValidationError("Tasdiqlash parolingiz xato ekan")
+        if result == verification.EXPIRED:
+            raise serializers.ValidationError("Kod to'g'ri lekin bu eskirgan yangi generate qiling")
+        if result == verification.OK:
+            return data
+        
+        user_confirm = UserConfirmation.objects.latest_live(user, code)
         
         if not user_confirm:
             raise serializers.ValidationError("Tasdiqlash parolingiz xato ekan")
@@ -89,8 +83,8 @@ class VerifyUserSerializer(serializers.ModelSerializer):
         if user_confirm and user_confirm.expiration_time < now():
             raise serializers.ValidationError("Kod to'g'ri lekin bu eskirgan yangi generate qiling")
         
-        user_confirm.is_used = True
-        user_confirm.save(update_fields=['is_used'])
+        if not verification.consume(user_confirm.pk) or not UserConfirmation.objects.mark_used(user_confirm.pk):
+            raise serializers.ValidationError("Tasdiqlash parolingiz xato ekan")
         
         return data
 
@@ -117,8 +111,6 @@ class CreateUserMainInfoSerializer(serializers.ModelSerializer):
         if instance.auth_status == choices.AuthStatusChoice.CodeVerified:
             instance.auth_status = choices.AuthStatusChoice.Done
         
-        instance.save()
-        
         return super().update(instance, validated_data)
 
 
@@ -138,9 +130,17 @@ class ChangeProfilePictureSerializer(serializers.ModelSerializer):
         return data
     
     def update(self, instance, validated_data):
+        upload = validated_data.pop('profile_picture', None)
+        if upload:
+            try:
+                path = images.store_upload(upload)
+            except images.InvalidImage as exc:
+                raise serializers.ValidationError({'profile_picture': [str(exc)]})
+            uploaded_at = now().isoformat()
+            transaction.on_commit(lambda: process_profile_picture.delay(str(instance.pk), path, uploaded_at))
+        
         if instance.auth_status == choices.AuthStatusChoice.Done:
             instance.auth_status = choices.AuthStatusChoice.Finished
-            instance.save()
         
         return super().update(instance, validated_data)
 
@@ -155,15 +155,27 @@ class UserLoginSerializer(serializers.ModelSerializer):
     
     def validate(self, attrs):
         login_name = attrs.get('login_name')
-        user = User.objects.filter(Q(username=login_name) | Q(email=login_name) | Q(phone_number=login_name)).first()
-        if not user or not check_password(attrs.get('password'), user.password):
+        user = User.objects.get_by_login_name(login_name)
+        try:
+            valid = verify_password(user, attrs.get('password'))
+        except HashingUnavailable as exc:
+            raise ServiceBusy(str(exc))
+        if not valid:
             raise serializers.ValidationError("Invalid login credentials.")
         token = user.token()
         attrs['token'] = token
         return attrs
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
-        fields = ['username', 'first_name', 'last_name', 'birth_date', 'gender', 'email', 'phone_number', 'profile_picture', 'auth_status', 'auth_type', 'is_premium']
+        fields = ['username', 'first_name', 'last_name', 'birth_date', 'gender', 'email', 'phone_number', 'profile_picture', 'profile_picture_variants', 'auth_status', 'auth_type', 'is_premium']
+    
+    def get_profile_picture_variants(self, obj):
+        return {
+            size: {ext: profile_picture_storage.url(name) for ext, name in files.items()}
+            for size, files in obj.profile_picture_variants.items()
+        }
         
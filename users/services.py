@@ -0,0 +1,35 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .identifiers import Identifier, InvalidIdentifier, classify
+from .models import User, UserConfirmation
+
+
+@transaction.atomic
+def sign_up(identifier):
+    if not isinstance(identifier, Identifier):
+        identifier = classify(identifier)
+    
+    user = User(**{identifier.field: identifier.value}, auth_type=identifier.kind)
+    user.generate_username_and_password()
+    user.save()
+    UserConfirmation.objects.issue(user)
+    
+    return user
+
+
+def identifier_conflicts():
+    # bir xil normallashgan email/telefonga tushadigan akkauntlar, ularni operator qo'lda hal qiladi
+    groups = defaultdict(list)
+    for field in ('email', 'phone_number'):
+        rows = User.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).values_list(
+            'pk', 'username', field, 'auth_status', 'date_joined'
+        )
+        for pk, username, value, auth_status, date_joined in rows.iterator(chunk_size=2000):
+            try:
+                identifier = classify(value)
+            except InvalidIdentifier:
+                continue
+            groups[(field, identifier.value)].append((pk, username, value, auth_status, date_joined))
+    return {key: users for key, users in groups.items() if len(users) > 1}
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import posixpath
+from uuid import uuid4
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        hexdigest = digest.hexdigest()
+        prefix = name.replace('\\', '/').split('/', 1)[0] if '/' in name else ''
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(prefix, hexdigest[:2], f"{hexdigest}{ext}")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # qayta ishlatilgan blob yangi hisoblanadi, aks holda media GC uni min_age dan o'tgan deb o'chiradi
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+
+        tmp_name = self._save(f"{name}.{uuid4().hex}.tmp", content)
+        os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+    def iter_files(self, prefix):
+        directories, files = self.listdir(prefix)
+        for filename in files:
+            yield posixpath.join(prefix, filename)
+        for directory in directories:
+            yield from self.iter_files(posixpath.join(prefix, directory))
+
+
+profile_picture_storage = ContentAddressedStorage()
+
+
+def get_profile_picture_storage():
+    return profile_picture_storage
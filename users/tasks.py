@@ -1,11 +1,120 @@
+from collections import defaultdict
+
 from celery import shared_task
-from django.core.mail import send_mail
+from .idempotency import claim_send, is_sent, send_key, sent_keys
+from .notifications import get_dispatcher, verify_notification
+
+
+# Bir xil (user, confirmation) uchun takroriy va retry qilingan task'lar xabarni qayta yubormaydi,
+# eskirgan, ishlatilgan yoki yangisi chiqqan kodlar umuman yuborilmaydi
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=60, max_retries=3)
+def send_verify_code(verify_type, recipient, code, expiration_time, user_id=None, confirmation_id=None):
+    key = None
+    if confirmation_id is not None:
+        from .models import UserConfirmation
+        
+        key = send_key(user_id, confirmation_id)
+        if is_sent(key) or not UserConfirmation.objects.is_current(user_id, confirmation_id):
+            return False
+        if not claim_send(key):
+            return False
+    
+    get_dispatcher(verify_type).send([verify_notification(recipient, code, expiration_time, key)])
+    return True
+
+
+# Ommaviy yuborish: importer har chunk uchun bitta task qo'yadi, dispatcher esa uni
+# NOTIFICATION_BATCH_SIZE'lik bo'laklarga bo'ladi. Har element (user, confirmation) kaliti bilan
+# keladi, retry'da oldingi urinishda yuborilgan bo'laklar qayta yuborilmaydi
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=60, max_retries=3)
+def send_verify_codes(items):
+    # deploy'dan oldin navbatga tushgan elementlar kalitsiz (4 ta maydon) bo'ladi
+    keys = [send_key(*item[4:]) if len(item) > 4 else None for item in items]
+    sent = sent_keys([key for key in keys if key])
+    by_channel = defaultdict(list)
+    for (verify_type, recipient, code, expiration_time, *_), key in zip(items, keys):
+        if key and (key in sent or not claim_send(key)):
+            continue
+        by_channel[verify_type].append(verify_notification(recipient, code, expiration_time, key))
+    return sum(get_dispatcher(channel).send(batch) for channel, batch in by_channel.items())
+
 
 @shared_task
 def send_verify_email(email, code, expiration_time):
-    print("Task boshlandi ------")
-    print(f"Mana: {email} {code} {expiration_time}")
-    subject = "Xush kelibsiz !"
-    message = f"Akkauntingizni aktivlashtirish uchun parol: {code}\nparol amal qilish muddati: {expiration_time} gacha"
-    send_mail(subject, message, None, [email])
-    print("Task tugadi -----")
\ No newline at end of file
+    send_verify_code("Email", email, code, expiration_time)
+
+
+# verification endi is_used'ni o'zi yozadi, task deploy paytida navbatda qolgan xabarlar uchun turibdi
+@shared_task(ignore_result=True)
+def mark_confirmation_used(confirmation_id):
+    from django.utils import timezone
+    from .models import UserConfirmation
+    
+    UserConfirmation.objects.filter(pk=confirmation_id, is_used=False).update(is_used=True, updated_at=timezone.now())
+
+
+@shared_task
+def purge_confirmations(retention_seconds=None, batch_size=None):
+    from .purge import purge_confirmations as purge
+    return purge(retention_seconds, batch_size)
+
+
+@shared_task(ignore_result=True)
+def record_outstanding_tokens(items):
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+    from rest_framework_simplejwt.utils import datetime_from_epoch
+    
+    OutstandingToken.objects.bulk_create([
+        OutstandingToken(
+            user_id=item['user_id'],
+            jti=item['jti'],
+            token=item['token'],
+            created_at=datetime_from_epoch(item['iat']),
+            expires_at=datetime_from_epoch(item['exp']),
+        )
+        for item in items
+    ], ignore_conflicts=True)
+
+
+@shared_task(ignore_result=True)
+def record_blacklisted_tokens(items):
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+    
+    record_outstanding_tokens(items)
+    token_ids = OutstandingToken.objects.filter(jti__in=[item['jti'] for item in items]).values_list('id', flat=True)
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id in token_ids], ignore_conflicts=True
+    )
+
+
+@shared_task
+def flush_expired_tokens(batch_size=None):
+    from .purge import flush_expired_tokens as flush
+    return flush(batch_size)
+
+
+@shared_task
+def process_profile_picture(user_id, path, uploaded_at=None):
+    import os
+    from django.db import transaction
+    from django.utils.dateparse import parse_datetime
+    from .images import build_variants
+    from .models import User
+    
+    uploaded_at = parse_datetime(uploaded_at) if uploaded_at else None
+    try:
+        variants = build_variants(path)
+        largest = variants[max(variants, key=int)]
+        with transaction.atomic():
+            user = User.objects.select_for_update().get(pk=user_id)
+            # ketma-ket ikki yuklashdan keyin tugagan eskisi yangisining ustiga yozmaydi
+            current = user.profile_picture_uploaded_at
+            if uploaded_at and current and current >= uploaded_at:
+                return
+            user.profile_picture = largest['jpg']
+            user.profile_picture_variants = variants
+            user.profile_picture_uploaded_at = uploaded_at
+            user.save(update_fields=['profile_picture', 'profile_picture_variants', 'profile_picture_uploaded_at'])
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,3 +1,1062 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.db import connection, connections, transaction
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from config.database import postgres_database, sqlite_database
+from config.urls import metrics
+from utils.metrics import Registry, registry
+from utils.routers import cacheable_read, pin_key, pin_user, replica_reads
+
+from . import async_views, choices, importer, notifications, passwords, services, verification
+from .identifiers import InvalidIdentifier, classify
+from .idempotency import claim_send, is_sent, release_send, send_key, sent_keys
+from .models import User, UserConfirmation
+from .authentication import CachedJWTAuthentication, user_cache
+from .passwords import verify_password
+from .ratelimit import SlidingWindowLimiter
+from .purge import collect_media_garbage, flush_expired_tokens
+from .storage import profile_picture_storage
+from .serializers import VerifyUserSerializer
+from .tasks import (
+    process_profile_picture, record_blacklisted_tokens, record_outstanding_tokens, send_verify_code,
+    send_verify_codes,
+)
+from .tokens import RefreshToken, issue_tokens, warm_blacklist
+from .user_cache import profile_key
+from .notifications import Dispatcher, EmailBackend, verify_notification
+
+
+class CountingEmailBackend(LocMemEmailBackend):
+    connections = 0
+    batches = 0
+
+    def open(self):
+        CountingEmailBackend.connections += 1
+        return True
+
+    def send_messages(self, messages):
+        CountingEmailBackend.batches += 1
+        return super().send_messages(messages)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit'}})
+class SlidingWindowLimiterTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowLimiter('test', limit=3, window=60)
+
+    def hit_at(self, now, key="user"):
+        with mock.patch('users.ratelimit.time.time', return_value=now):
+            return self.limiter.hit(key)
+
+    def test_limit_and_separate_keys(self):
+        self.assertEqual([self.hit_at(100) for _ in range(5)], [True, True, True, False, False])
+        with mock.patch('users.ratelimit.time.time', return_value=100):
+            self.assertTrue(self.limiter.is_limited("user"))
+        self.assertTrue(self.hit_at(100, key="other"))
+
+    def test_previous_window_is_weighted_at_the_boundary(self):
+        for _ in range(3):
+            self.hit_at(100)
+        # 125: oldingi oynaning 55/60 qismi hali hisobda, 175: faqat 5/60 qismi
+        self.assertFalse(self.hit_at(125))
+        self.assertTrue(self.hit_at(175))
+        self.assertTrue(self.hit_at(240))
+
+    def test_concurrent_hits_do_not_overshoot(self):
+        with mock.patch('users.ratelimit.time.time', return_value=100):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda _: self.limiter.hit("user"), range(40)))
+        self.assertEqual(results.count(True), 3)
+
+
+@override_settings(EMAIL_BACKEND='users.tests.CountingEmailBackend')
+class NotificationDispatcherLoadTest(SimpleTestCase):
+    def setUp(self):
+        CountingEmailBackend.connections = 0
+        CountingEmailBackend.batches = 0
+        notifications._dispatchers.clear()
+        self.addCleanup(notifications._dispatchers.clear)
+
+    def test_batches_share_one_connection(self):
+        dispatcher = Dispatcher(EmailBackend(), batch_size=100)
+        items = [verify_notification(f"user{i}@example.com", 1234, "2026-01-01") for i in range(1050)]
+        self.assertEqual(dispatcher.send(items), 1050)
+        self.assertEqual(len(mail.outbox), 1050)
+        self.assertEqual(CountingEmailBackend.batches, 11)
+        self.assertEqual(CountingEmailBackend.connections, 1)
+
+    def test_single_sends_reuse_the_worker_connection(self):
+        for i in range(20):
+            self.assertTrue(send_verify_code("Email", f"user{i}@example.com", "1234", "2026-01-01"))
+        self.assertEqual(len(mail.outbox), 20)
+        self.assertEqual(CountingEmailBackend.connections, 1)
+
+    def test_disconnected_connection_is_reopened(self):
+        backend = EmailBackend()
+        item = verify_notification("user@example.com", 1234, "2026-01-01")
+        backend.send_batch([item])
+        with mock.patch.object(CountingEmailBackend, 'send_messages', side_effect=[smtplib.SMTPServerDisconnected, 1]):
+            self.assertEqual(backend.send_batch([item]), 1)
+        self.assertEqual(CountingEmailBackend.connections, 2)
+
+    def test_failed_batch_is_raised_to_the_caller(self):
+        dispatcher = Dispatcher(EmailBackend(), batch_size=2)
+        notifications = [verify_notification(f"user{i}@example.com", 1234, "2026-01-01") for i in range(3)]
+        with mock.patch.object(CountingEmailBackend, 'send_messages', side_effect=[2, OSError]):
+            with self.assertRaises(OSError), self.assertLogs('users.notifications', 'ERROR'):
+                dispatcher.send(notifications)
+
+
+class DatabaseConfigTest(SimpleTestCase):
+    def test_sqlite_profile_applies_pragmas_per_connection(self):
+        options = sqlite_database('db.sqlite3')['OPTIONS']
+        self.assertIn("PRAGMA journal_mode=WAL;", options['init_command'])
+        self.assertIn("PRAGMA synchronous=NORMAL;", options['init_command'])
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+        self.assertNotIn('OPTIONS', sqlite_database('db.sqlite3', tuned=False))
+
+    def test_postgres_pool_disables_persistent_connections(self):
+        with mock.patch.dict(os.environ, {'POSTGRES_POOL': 'true'}):
+            database = postgres_database()
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', database['OPTIONS'])
+        self.assertTrue(postgres_database()['CONN_HEALTH_CHECKS'])
+
+
+class CeleryRoutingTest(SimpleTestCase):
+    def test_verification_tasks_get_their_own_queue(self):
+        from config.celery import app
+
+        router = app.amqp.router
+        for name in ('send_verify_code', 'send_verify_codes', 'send_verify_email'):
+            self.assertEqual(router.route({}, f"users.tasks.{name}")['queue'].name, 'notifications')
+        self.assertEqual(router.route({}, "users.tasks.purge_confirmations")['queue'].name, 'default')
+        self.assertTrue(app.conf.task_acks_late)
+        self.assertEqual(app.conf.worker_prefetch_multiplier, 1)
+
+    def test_smtp_errors_are_retried_by_the_task(self):
+        notifications._dispatchers.clear()
+        self.addCleanup(notifications._dispatchers.clear)
+        with mock.patch.object(notifications.EmailBackend, 'send_batch', side_effect=[OSError, 1]) as send_batch:
+            with self.assertLogs('users.notifications', 'ERROR'):
+                result = send_verify_code.apply(("Email", "user@example.com", "1234", "2026-01-01"))
+        self.assertTrue(result.get())
+        self.assertEqual(send_batch.call_count, 2)
+
+
+@mock.patch('users.models.send_verify_code.delay')
+class SignUpServiceTest(TestCase):
+    def test_notification_is_sent_after_commit(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = services.sign_up("user@example.com")
+            delay.assert_not_called()
+
+        confirmation = user.confirmations.get()
+        delay.assert_called_once_with(
+            "Email", "user@example.com", confirmation.code, confirmation.expiration_time,
+            user_id=str(user.id), confirmation_id=str(confirmation.id),
+        )
+        self.assertEqual(user.username, str(user.id))
+        self.assertFalse(user.has_usable_password())
+
+    def test_rolled_back_sign_up_sends_nothing(self, delay):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    services.sign_up("+998901234567")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        delay.assert_not_called()
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(UserConfirmation.objects.exists())
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class VerifySendIdempotencyTest(TestCase):
+    def setUp(self):
+        notifications._dispatchers.clear()
+        with mock.patch('users.models.send_verify_code.delay'):
+            self.user = User.objects.create(email="user@example.com")
+        self.confirmation = self.user.confirmations.get()
+
+    def tearDown(self):
+        notifications._dispatchers.clear()
+
+    def send(self, confirmation):
+        return send_verify_code(
+            "Email", "user@example.com", confirmation.code, confirmation.expiration_time,
+            user_id=str(self.user.id), confirmation_id=str(confirmation.id),
+        )
+
+    @mock.patch('users.models.send_verify_code.delay')
+    def test_duplicate_enqueues_collapse(self, delay):
+        self.confirmation.send_verify()
+        self.confirmation.send_verify()
+        self.assertEqual(delay.call_count, 1)
+
+    def test_retries_and_duplicates_send_once(self):
+        self.assertTrue(self.send(self.confirmation))
+        self.assertFalse(self.send(self.confirmation))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_superseded_and_used_codes_are_skipped(self):
+        with mock.patch('users.models.send_verify_code.delay'):
+            newer = UserConfirmation.objects.issue(self.user)
+        self.assertFalse(self.send(self.confirmation))
+
+        newer.is_used = True
+        newer.save(update_fields=['is_used'])
+        self.assertFalse(self.send(newer))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_send_can_be_retried(self):
+        with mock.patch.object(notifications.EmailBackend, 'send_batch', side_effect=OSError):
+            with self.assertRaises(OSError), self.assertLogs('users.notifications', 'ERROR'):
+                self.send(self.confirmation)
+        self.assertTrue(self.send(self.confirmation))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_pair_is_marked_sent_only_after_delivery(self):
+        key = send_key(str(self.user.id), str(self.confirmation.id))
+        with mock.patch.object(notifications.EmailBackend, 'send_batch', side_effect=[OSError, OSError, 1]) as send_batch:
+            with self.assertLogs('users.notifications', 'ERROR'):
+                with self.assertRaises(OSError):
+                    self.send(self.confirmation)
+                self.assertFalse(is_sent(key))
+                self.assertTrue(claim_send(key))
+                release_send(key)
+
+                result = send_verify_code.apply(
+                    ("Email", "user@example.com", self.confirmation.code, self.confirmation.expiration_time),
+                    {'user_id': str(self.user.id), 'confirmation_id': str(self.confirmation.id)},
+                )
+        self.assertTrue(result.get())
+        self.assertEqual(send_batch.call_count, 3)
+        self.assertTrue(is_sent(key))
+        self.assertFalse(self.send(self.confirmation))
+
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_bulk_retry_skips_chunks_already_sent(self):
+        items = [
+            ("Email", f"user{i}@example.com", "1234", "2026-01-01", str(self.user.id), f"bulk-{i}")
+            for i in range(5)
+        ]
+        with mock.patch.object(notifications.EmailBackend, 'send_batch', side_effect=[2, OSError, 2, 1]) as send_batch:
+            with self.assertLogs('users.notifications', 'ERROR'):
+                result = send_verify_codes.apply((items,))
+        self.assertEqual(result.get(), 3)
+        sent = [[item.recipient for item in call.args[0]] for call in send_batch.call_args_list]
+        self.assertEqual(sent, [
+            ["user0@example.com", "user1@example.com"],
+            ["user2@example.com", "user3@example.com"],
+            ["user2@example.com", "user3@example.com"],
+            ["user4@example.com"],
+        ])
+        self.assertEqual(sent_keys([send_key(str(self.user.id), f"bulk-{i}") for i in range(5)]), {
+            send_key(str(self.user.id), f"bulk-{i}") for i in range(5)
+        })
+
+
+class CodeVerificationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        with mock.patch('users.models.send_verify_code.delay'), self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(email="user@example.com")
+        self.confirmation = self.user.confirmations.get()
+
+    def verify(self, code):
+        serializer = VerifyUserSerializer(data={'code': code}, context={'user': self.user})
+        return serializer.is_valid(), serializer.errors
+
+    def test_correct_code_is_checked_from_cache_and_marked_used(self):
+        with self.assertNumQueries(1):
+            valid, _ = self.verify(self.confirmation.code)
+        self.assertTrue(valid)
+        self.confirmation.refresh_from_db()
+        self.assertTrue(self.confirmation.is_used)
+        self.assertFalse(self.verify(self.confirmation.code)[0])
+
+    def test_code_used_in_another_process_is_rejected(self):
+        # boshqa jarayonning LocMem cache'i: consumed belgisi bu yerda ko'rinmaydi
+        UserConfirmation.objects.mark_used(self.confirmation.pk)
+        self.assertFalse(self.verify(self.confirmation.code)[0])
+
+    def test_attempts_are_throttled_without_sql(self):
+        wrong = "0000" if self.confirmation.code != "0000" else "1111"
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.assertFalse(self.verify(wrong)[0])
+            _, errors = self.verify(self.confirmation.code)
+        self.assertIn("Juda ko'p urinish", str(errors))
+
+    def test_falls_back_to_database_on_cache_miss(self):
+        cache.delete(verification.code_key(self.user.pk))
+        self.assertTrue(self.verify(self.confirmation.code)[0])
+        self.confirmation.refresh_from_db()
+        self.assertTrue(self.confirmation.is_used)
+        self.assertFalse(self.verify(self.confirmation.code)[0])
+
+
+@mock.patch('users.models.send_verify_code.delay')
+class SignUpStatementCountTest(TestCase):
+    def test_sign_up_service(self, delay):
+        # SAVEPOINT, INSERT user, INSERT confirmation, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            services.sign_up("user@example.com")
+
+    def test_legacy_create_is_single_write(self, delay):
+        with self.assertNumQueries(2):
+            user = User.objects.create(phone_number="+998901234567")
+
+        user.refresh_from_db()
+        self.assertEqual(user.username, str(user.id))
+        self.assertEqual(user.auth_type, "Phone")
+        self.assertEqual(user.confirmations.count(), 1)
+
+
+@mock.patch('users.importer.send_verify_codes.delay')
+class ImportUsersTest(TestCase):
+    def test_import_dedupes_and_validates(self, delay):
+        User.objects.create(email="old@example.com")
+        lines = [
+            "email_or_phone\n",
+            "old@example.com\n",
+            "new@example.com\n",
+            "new@example.com\n",
+            "+998901234567\n",
+            "not-valid\n",
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = importer.import_users(lines, 'csv', chunk_size=2)
+
+        self.assertEqual((stats.read, stats.created, stats.invalid, stats.duplicates), (5, 2, 1, 2))
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(UserConfirmation.objects.count(), 3)
+        self.assertEqual(sum(len(call.args[0]) for call in delay.call_args_list), 2)
+        for call in delay.call_args_list:
+            for *_, user_id, confirmation_id in call.args[0]:
+                self.assertTrue(UserConfirmation.objects.filter(pk=confirmation_id, user_id=user_id).exists())
+
+    def test_malformed_lines_are_counted_as_invalid(self, delay):
+        lines = [
+            b'{"email": "new@example.com"}\n',
+            b'{"email": \n',
+            b'[1, 2]\n',
+            b'"caf\xe9@example.com"\n',
+            b'"+998901234567"\n',
+        ]
+        stats = importer.import_users(lines, 'jsonl')
+        self.assertEqual((stats.read, stats.created, stats.invalid), (5, 2, 3))
+
+        stats = importer.import_users([b'other@example.com\n', b'\xff\xfe\n'], 'csv')
+        self.assertEqual((stats.read, stats.created, stats.invalid), (2, 1, 1))
+
+
+class IdentifierTest(SimpleTestCase):
+    def test_normalizes_to_canonical_form(self):
+        self.assertEqual(classify(" User@Example.COM "), ("Email", "user@example.com"))
+        self.assertEqual(classify("998 90 123-45-67"), ("Phone", "+998901234567"))
+        self.assertEqual(classify("+998901234567"), ("Phone", "+998901234567"))
+
+    def test_rejects_invalid_values(self):
+        for value in ("0998901234567", "user@example", "username"):
+            with self.assertRaises(InvalidIdentifier):
+                classify(value)
+
+
+class LoginLookupTest(TestCase):
+    def setUp(self):
+        self.email_user = User.objects.create(email="User@Example.com")
+        self.phone_user = User.objects.create(phone_number="+998901234567")
+
+    def query_plan(self, login_name):
+        with CaptureQueriesContext(connection) as queries:
+            user = User.objects.get_by_login_name(login_name)
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            return user, " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_each_identifier_hits_one_index(self):
+        user, plan = self.query_plan("user@example.COM")
+        self.assertEqual(user, self.email_user)
+        self.assertIn("USING INDEX user_email_lower_idx", plan)
+
+        user, plan = self.query_plan("+998 90 123 45 67")
+        self.assertEqual(user, self.phone_user)
+        self.assertIn("USING INDEX", plan)
+
+        user, plan = self.query_plan(self.email_user.username)
+        self.assertEqual(user, self.email_user)
+        self.assertIn("USING INDEX", plan)
+
+    def test_legacy_identifiers_are_normalized_without_touching_conflicts(self):
+        from django.apps import apps
+        migration = importlib.import_module('users.migrations.0009_normalize_identifiers')
+
+        User.objects.filter(pk=self.phone_user.pk).update(phone_number="998901234567", auth_status=choices.AuthStatusChoice.Done)
+        duplicate, legacy, legacy_phone = User.objects.bulk_create([
+            User(username="duplicate", phone_number="+998901234567", auth_type=choices.AuthTypeChoice.Phone),
+            User(username="legacy", email="Legacy@Example.com", auth_type=choices.AuthTypeChoice.Email),
+            User(username="legacy-phone", phone_number="998 90 765 43 21", auth_type=choices.AuthTypeChoice.Phone),
+        ])
+
+        migration.normalize_identifiers(apps, None)
+
+        self.assertEqual(User.objects.get(pk=legacy.pk).email, "legacy@example.com")
+        self.assertEqual(User.objects.get(pk=legacy_phone.pk).phone_number, "+998907654321")
+        self.assertEqual(User.objects.get(pk=self.email_user.pk).email, "user@example.com")
+        self.assertEqual(User.objects.get(pk=self.phone_user.pk).phone_number, "998901234567")
+        self.assertTrue(User.objects.filter(pk=duplicate.pk, phone_number="+998901234567").exists())
+
+        out = StringIO()
+        call_command('identifier_conflicts', stdout=out)
+        self.assertIn("phone_number=+998901234567", out.getvalue())
+        self.assertIn(str(self.phone_user.pk), out.getvalue())
+        self.assertIn("To'qnashuvlar: 1 ta", out.getvalue())
+
+
+@override_settings(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=8, ARGON2_PARALLELISM=1)
+class VerifyPasswordTest(TestCase):
+    def test_verifies_in_pool(self):
+        user = User.objects.create_user(username="sodiq", password="secret-pass")
+        self.assertTrue(verify_password(user, "secret-pass"))
+        self.assertFalse(verify_password(user, "wrong-pass"))
+
+    def test_unknown_and_passwordless_users_still_hash(self):
+        passwordless = User.objects.create(email="user@example.com")
+        with mock.patch('users.passwords.make_password') as make_password:
+            self.assertFalse(verify_password(None, "secret-pass"))
+            self.assertFalse(verify_password(passwordless, "secret-pass"))
+        self.assertEqual(make_password.call_count, 2)
+
+    def test_rehashes_when_parameters_change(self):
+        user = User.objects.create_user(username="sodiq", password="secret-pass")
+        with override_settings(ARGON2_TIME_COST=2):
+            self.assertTrue(verify_password(user, "secret-pass"))
+        user.refresh_from_db()
+        self.assertIn("t=2", user.password)
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=0, PASSWORD_HASHING_TIMEOUT=0.05)
+    def test_busy_or_slow_hashing_returns_503(self):
+        User.objects.create_user(username="sodiq", password="secret-pass")
+        release = threading.Event()
+        calls = []
+
+        def slow_verify(raw_password, encoded):
+            calls.append(raw_password)
+            release.wait(5)
+            return False
+
+        with mock.patch.object(passwords, '_executor', None), mock.patch.object(passwords, '_slots', None), \
+                mock.patch('users.passwords._verify', slow_verify):
+            self.addCleanup(release.set)
+            login = {'login_name': "sodiq", 'password': "secret-pass"}
+            response = self.client.post('/users/login/', login)
+            self.assertEqual(response.status_code, 503)
+            self.addCleanup(passwords._executor.shutdown, wait=False)
+
+            # birinchi ish hali ishlayapti, navbat 0: ikkinchisi kutmasdan rad etiladi
+            response = self.client.post('/users/login/', login)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(len(calls), 1)
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create(email="user@example.com")
+        self.authenticator = CachedJWTAuthentication()
+        self.token = self.authenticator.get_validated_token(self.user.token()['access'])
+
+    def test_token_carries_status_claims(self):
+        self.assertEqual(self.token['auth_status'], "New")
+        self.assertEqual(self.token['auth_type'], "Email")
+        self.assertFalse(self.token['is_premium'])
+
+    def test_repeated_requests_skip_the_database(self):
+        with self.assertNumQueries(1):
+            self.authenticator.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authenticator.get_user(self.token)
+        self.assertEqual(user, self.user)
+
+    def test_save_invalidates_cached_user(self):
+        self.authenticator.get_user(self.token)
+        self.user.auth_status = "CodeVerified"
+        self.user.save(update_fields=['auth_status'])
+
+        with self.assertNumQueries(1):
+            user = self.authenticator.get_user(self.token)
+        self.assertEqual(user.auth_status, "CodeVerified")
+
+
+class ProfileConditionalGetTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create(email="user@example.com")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.user.token()['access']}")
+
+    def test_unchanged_profile_returns_304_without_serializing(self):
+        response = self.client.get('/users/me/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with mock.patch('users.serializers.UserProfileSerializer') as serializer:
+            response = self.client.get('/users/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        serializer.assert_not_called()
+
+        response = self.client.get('/users/me/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_empty_update_fields_stays_a_no_op(self):
+        with self.assertNumQueries(0):
+            self.user.save(update_fields=[])
+
+    def test_save_changes_etag(self):
+        etag = self.client.get('/users/me/')['ETag']
+        self.user.first_name = "Sodiq"
+        self.user.save(update_fields=['first_name'])
+
+        response = self.client.get('/users/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['data']['first_name'], "Sodiq")
+
+
+@mock.patch('users.tokens.record_outstanding_tokens.delay', new=mock.Mock())
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        registry.clear()
+        self.user = User.objects.create_user(username="sodiq", email="user@example.com", password="secret-pass")
+
+    def login(self):
+        return APIClient().post('/users/login/', {'login_name': "sodiq", 'password': "secret-pass"}, format='json')
+
+    def scrape(self, user=None, remote_addr='127.0.0.1'):
+        request = RequestFactory().get('/metrics', REMOTE_ADDR=remote_addr)
+        request.user = user or AnonymousUser()
+        return request
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.2'])
+    def test_metrics_are_limited_to_staff_and_allowed_ips(self):
+        self.assertEqual(metrics(self.scrape(remote_addr='203.0.113.7')).status_code, 403)
+        self.assertEqual(metrics(self.scrape(self.user, remote_addr='203.0.113.7')).status_code, 403)
+        self.assertEqual(metrics(self.scrape(remote_addr='10.0.0.2')).status_code, 200)
+        self.user.is_staff = True
+        self.assertEqual(metrics(self.scrape(self.user, remote_addr='203.0.113.7')).status_code, 200)
+
+    def test_worker_snapshots_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for pid in (101, 102):
+            worker = Registry(directory)
+            with mock.patch('utils.metrics.os.getpid', return_value=pid):
+                worker.inc('http_requests_total', view='login', method='POST', status=200)
+                worker.observe('http_request_duration_seconds', 0.2, view='login')
+                worker.dump()
+
+        body = Registry(directory).render()
+        self.assertIn('http_requests_total{method="POST",status="200",view="login"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="login",le="0.25"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{view="login"} 2', body)
+        self.assertEqual(sorted(os.listdir(directory)), ['101.json', '102.json', f'{os.getpid()}.json'])
+
+    @override_settings(PERFORMANCE_METRICS=True)
+    def test_login_reports_server_timing_and_metrics(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("hash;dur=", timing)
+        self.assertIn("sign;dur=", timing)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['data']['token']['access']}")
+        self.assertIn('cache;desc="hit=0 miss=2"', client.get('/users/me/')['Server-Timing'])
+        self.assertIn('cache;desc="hit=2 miss=0"', client.get('/users/me/')['Server-Timing'])
+
+        body = metrics(self.scrape()).content.decode()
+        self.assertIn('http_requests_total{method="POST",status="200",view="login"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="login",le="+Inf"} 1', body)
+        self.assertIn('hash_seconds_total{view="login"}', body)
+
+    def test_disabled_middleware_adds_nothing(self):
+        response = self.login()
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.render(), "\n")
+
+
+@mock.patch('users.tokens.record_outstanding_tokens.delay', new=mock.Mock())
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username="sodiq", email="user@example.com", password="secret-pass")
+        self.factory = AsyncRequestFactory()
+
+    def login(self, login_name, password):
+        return self.factory.post(
+            '/users/login/', {'login_name': login_name, 'password': password}, content_type='application/json'
+        )
+
+    async def test_login_matches_sync_response(self):
+        response = await async_views.login(self.login("USER@example.com", "secret-pass"))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertTrue(body['status'])
+        self.assertEqual(set(body['data']['token']), {'refresh', 'access'})
+
+        response = await async_views.login(self.login("nobody@example.com", "secret-pass"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {"non_field_errors": ["Invalid login credentials."]})
+
+    def test_async_endpoints_stay_in_the_schema(self):
+        paths = self.client.get('/swagger/', {'format': 'openapi'}).json()['paths']
+        self.assertIn('post', paths['/login/'])
+        self.assertIn('get', paths['/me/'])
+
+    async def test_profile_info_supports_conditional_get(self):
+        access = (await sync_to_async(issue_tokens)(self.user))['access']
+        headers = {'Authorization': f"Bearer {access}"}
+
+        response = await async_views.profile_info(self.factory.get('/users/me/', headers=headers))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data']['email'], "user@example.com")
+
+        request = self.factory.get('/users/me/', headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual((await async_views.profile_info(request)).status_code, 304)
+
+        response = await async_views.profile_info(self.factory.get('/users/me/'))
+        self.assertEqual(response.status_code, 401)
+
+
+@mock.patch('users.tokens.record_blacklisted_tokens.delay', new=mock.Mock())
+@mock.patch('users.tokens.record_outstanding_tokens.delay')
+class TokenIssuanceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="user@example.com")
+
+    def test_issuing_tokens_does_not_touch_the_database(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(0):
+                tokens = issue_tokens(self.user)
+
+        item = delay.call_args.args[0][0]
+        self.assertEqual(item['token'], tokens['refresh'])
+        self.assertEqual(item['user_id'], str(self.user.pk))
+
+        record_outstanding_tokens([item, item])
+        self.assertEqual(OutstandingToken.objects.get().jti, item['jti'])
+
+    def test_rotated_refresh_token_is_recorded_asynchronously(self, delay):
+        refresh = issue_tokens(self.user)['refresh']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/users/token-refresh/', {'refresh': refresh})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(delay.call_args.args[0][0]['token'], response.data['refresh'])
+
+
+@mock.patch('users.tokens.record_outstanding_tokens.delay')
+@mock.patch('users.tokens.record_blacklisted_tokens.delay')
+class TokenBlacklistTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="user@example.com")
+        cache.clear()
+        warm_blacklist()
+
+    def test_logout_is_checked_from_cache(self, blacklist_delay, outstanding_delay):
+        refresh = issue_tokens(self.user)['refresh']
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(0):
+                self.assertEqual(client.post('/users/logout/', {'refresh': refresh}).status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = client.post('/users/token-refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+        record_blacklisted_tokens(blacklist_delay.call_args.args[0])
+        self.assertEqual(BlacklistedToken.objects.get().token.jti, blacklist_delay.call_args.args[0][0]['jti'])
+
+    def test_token_blacklisted_only_in_the_table_is_rejected(self, blacklist_delay, outstanding_delay):
+        refresh = issue_tokens(self.user)['refresh']
+        record_blacklisted_tokens([RefreshToken(refresh)._record(refresh)])
+        cache.clear()
+
+        # marker yo'q: bitta so'rov bilan cache qayta yuklanadi
+        with self.assertNumQueries(1):
+            self.assertEqual(APIClient().post('/users/token-refresh/', {'refresh': refresh}).status_code, 401)
+        with self.assertNumQueries(0):
+            self.assertEqual(APIClient().post('/users/token-refresh/', {'refresh': refresh}).status_code, 401)
+
+    def test_flush_removes_only_expired_tokens(self, blacklist_delay, outstanding_delay):
+        now = timezone.now()
+        OutstandingToken.objects.bulk_create([
+            OutstandingToken(jti=str(i), token="x", expires_at=now + timedelta(days=1 if i % 2 else -1))
+            for i in range(25)
+        ])
+        result = flush_expired_tokens(batch_size=5)
+        self.assertEqual(result['deleted'], 13)
+        self.assertEqual(OutstandingToken.objects.count(), 12)
+
+
+class ProfilePictureTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="user@example.com", auth_status="Done")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.media_root = os.path.join(self.tmp_dir, 'media')
+        self.upload_dir = os.path.join(self.tmp_dir, 'uploads')
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, PROFILE_PICTURE_UPLOAD_DIR=self.upload_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def make_upload(self, name="photo.jpg", size=(1200, 900)):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0110] = "Phone"
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    @mock.patch('users.serializers.process_profile_picture.delay')
+    def test_upload_is_processed_after_response(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/users/finish-profile/', {'profile_picture': self.make_upload()}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        user_id, path, uploaded_at = delay.call_args.args
+        self.assertFalse(path.startswith(self.media_root))
+        process_profile_picture(user_id, path, uploaded_at)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.auth_status, "Finished")
+        self.assertEqual(set(self.user.profile_picture_variants), {'64', '256', '512'})
+        self.assertFalse(os.path.exists(path))
+        with profile_picture_storage.open(self.user.profile_picture.name) as stored:
+            image = Image.open(stored)
+            self.assertEqual(max(image.size), 512)
+            self.assertEqual(dict(image.getexif()), {})
+
+    @mock.patch('users.serializers.process_profile_picture.delay')
+    def test_older_upload_finishing_last_does_not_win(self, delay):
+        for size in ((300, 200), (600, 400)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put('/users/finish-profile/', {'profile_picture': self.make_upload(size=size)}, format='multipart')
+        older, newer = (call.args for call in delay.call_args_list)
+
+        process_profile_picture(*newer)
+        process_profile_picture(*older)
+
+        self.user.refresh_from_db()
+        with profile_picture_storage.open(self.user.profile_picture.name) as stored:
+            self.assertEqual(Image.open(stored).size, (512, 341))
+        self.assertFalse(os.path.exists(older[1]))
+
+    def test_rejects_files_that_are_not_images(self):
+        upload = SimpleUploadedFile("photo.jpg", b"not an image", content_type='image/jpeg')
+        response = self.client.put('/users/finish-profile/', {'profile_picture': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(os.path.isdir(self.upload_dir) and os.listdir(self.upload_dir))
+
+    def test_identical_content_is_stored_once_and_orphans_are_collected(self):
+        first = profile_picture_storage.save("profile_pictures/avatar.png", ContentFile(b"same bytes"))
+        second = profile_picture_storage.save("profile_pictures/other.PNG", ContentFile(b"same bytes"))
+        orphan = profile_picture_storage.save("profile_pictures/old.jpg", ContentFile(b"old bytes"))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^profile_pictures/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+
+        User.objects.filter(pk=self.user.pk).update(profile_picture=first)
+        User.objects.create(email="other@example.com", profile_picture=first)
+
+        result = collect_media_garbage(min_age_seconds=0)
+        self.assertEqual((result['scanned'], result['shared'], result['deleted']), (2, 1, 1))
+        self.assertTrue(profile_picture_storage.exists(first))
+        self.assertFalse(profile_picture_storage.exists(orphan))
+
+    def test_deduplicated_save_refreshes_the_blob_age(self):
+        name = profile_picture_storage.save("profile_pictures/avatar.png", ContentFile(b"reused bytes"))
+        day_ago = time.time() - 86400
+        os.utime(profile_picture_storage.path(name), (day_ago, day_ago))
+
+        self.assertEqual(profile_picture_storage.save("profile_pictures/again.png", ContentFile(b"reused bytes")), name)
+        self.assertGreater(os.path.getmtime(profile_picture_storage.path(name)), day_ago)
+        self.assertEqual(collect_media_garbage(min_age_seconds=3600)['deleted'], 0)
+        self.assertTrue(profile_picture_storage.exists(name))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'endpoint-performance'}},
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+@mock.patch('users.importer.send_verify_codes.delay', new=mock.Mock())
+@mock.patch('users.serializers.process_profile_picture.delay', new=mock.Mock())
+@mock.patch('users.tokens.record_blacklisted_tokens.delay', new=mock.Mock())
+@mock.patch('users.tokens.record_outstanding_tokens.delay', new=mock.Mock())
+@mock.patch('users.models.send_verify_code.delay', new=mock.Mock())
+class EndpointPerformanceTest(TestCase):
+    # (qadam, aniq so'rovlar soni, so'rov uchun yuqori vaqt chegarasi soniyada)
+    # Hisob o'zgarsa shu jadvalni yangilang, USERS_PERF_REPORT=path.json esa natijani faylga yozadi
+    BUDGET = {
+        'sign-up': (5, 0.5),
+        'new-verify': (2, 0.5),
+        'verify-account': (2, 0.5),
+        'change-main-info': (3, 2),
+        'finish-profile': (2, 0.5),
+        'login': (1, 2),
+        'profile-info': (1, 0.5),
+        'profile-info-304': (0, 0.5),
+        'token-refresh': (1, 0.5),
+        'token-blacklist': (0, 0.5),
+        'import-users': (6, 0.5),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.report = []
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get('USERS_PERF_REPORT')
+        if path:
+            with open(path, 'w') as report:
+                json.dump({'steps': cls.report}, report, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        warm_blacklist()
+        self.client = APIClient()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, PROFILE_PICTURE_UPLOAD_DIR=os.path.join(self.media_root, 'uploads')
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def step(self, name, method, path, expected_status=200, **kwargs):
+        queries, max_seconds = self.BUDGET[name]
+        with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs)
+            seconds = time.perf_counter() - started
+
+        self.report.append({
+            'step': name,
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'queries': len(captured),
+            'ms': round(seconds * 1000, 2),
+        })
+        self.assertEqual(response.status_code, expected_status, response.content)
+        self.assertEqual(len(captured), queries, f"{name}:\n" + "\n".join(q['sql'] for q in captured.captured_queries))
+        self.assertLess(seconds, max_seconds, name)
+        return response
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_full_user_flow(self):
+        response = self.step('sign-up', 'post', '/users/sign-up/', 201, data={'email_or_phone': "flow@example.com"}, format='json')
+        self.authenticate(response.data['data']['token']['access'])
+        user = User.objects.get(email="flow@example.com")
+
+        self.step('new-verify', 'get', '/users/generate-new-verify/')
+        code = UserConfirmation.objects.filter(user=user).latest('created_at').code
+        self.step('verify-account', 'post', '/users/verify/', 201, data={'code': code}, format='json')
+
+        main_info = {
+            'username': "flow", 'password': "secret-pass", 'first_name': "Sodiq", 'last_name': "Sodiqov",
+            'birth_date': "2005-08-13", 'gender': choices.GenderChoice.choices[0][0],
+        }
+        self.step('change-main-info', 'patch', '/users/change-main-info/', data=main_info, format='json')
+
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), 'red').save(buffer, 'JPEG')
+        upload = SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type='image/jpeg')
+        self.step('finish-profile', 'put', '/users/finish-profile/', data={'profile_picture': upload}, format='multipart')
+
+        self.client.credentials()
+        response = self.step('login', 'post', '/users/login/', data={'login_name': "flow", 'password': "secret-pass"}, format='json')
+        tokens = response.data['data']['token']
+        self.authenticate(tokens['access'])
+
+        etag = self.step('profile-info', 'get', '/users/me/')['ETag']
+        self.step('profile-info-304', 'get', '/users/me/', 304, HTTP_IF_NONE_MATCH=etag)
+
+        self.client.credentials()
+        refreshed = self.step('token-refresh', 'post', '/users/token-refresh/', data={'refresh': tokens['refresh']}, format='json')
+        self.step('token-blacklist', 'post', '/users/logout/', data={'refresh': refreshed.data['refresh']}, format='json')
+
+        admin = User.objects.create_user(username="admin", password="secret-pass", is_staff=True)
+        self.client.force_authenticate(admin)
+        csv = SimpleUploadedFile("users.csv", b"email_or_phone\na@example.com\nb@example.com\n+998901234567\n")
+        self.step('import-users', 'post', '/users/import/', 201, data={'file': csv}, format='multipart')
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    DATABASE_ROUTERS=['utils.routers.PrimaryReplicaRouter'],
+)
+@mock.patch('users.tokens.record_outstanding_tokens.delay', new=mock.Mock())
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # primary (test bazasi) yonida replika o'rnida ikkinchi SQLite fayl, test tranzaksiyasidan
+        # tashqarida turadi va klass oxirida o'chiriladi
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings['replica'] = dict(
+            connections.settings['default'], NAME=os.path.join(cls.replica_dir, 'replica.sqlite3'), TEST={'MIRROR': None}
+        )
+        cls.databases = cls.databases | {'replica'}
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(User)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.databases = cls.databases - {'replica'}
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="sodiq", password="secret-pass", first_name="primary")
+        User.objects.using('replica').bulk_create([User(
+            id=self.user.id, username="sodiq", password=self.user.password, first_name="replica",
+            created_at=self.user.created_at, updated_at=self.user.updated_at,
+        )])
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.user.token()['access']}")
+
+    def first_name(self):
+        cache.delete(profile_key(self.user.pk))
+        user_cache.clear()
+        return self.client.get('/users/me/').data['data']['first_name']
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self.first_name(), "replica")
+
+    def test_writes_pin_the_client_to_primary(self):
+        response = APIClient().post('/users/login/', {'login_name': "sodiq", 'password': "secret-pass"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('pin_primary', response.cookies)
+
+        with mock.patch('users.models.send_verify_code.delay'):
+            response = self.client.get('/users/generate-new-verify/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pin_primary', response.cookies)
+        self.assertEqual(self.first_name(), "primary")
+
+        self.client.cookies.clear()
+        self.assertEqual(self.first_name(), "primary")
+
+        cache.delete(pin_key(self.user.pk))
+        self.assertEqual(self.first_name(), "replica")
+
+    def test_user_writes_pin_token_clients_without_cookies(self):
+        User.objects.filter(pk=self.user.pk).update(first_name="renamed")
+        self.user.invalidate_caches()
+        self.assertEqual(self.first_name(), "renamed")
+        self.assertEqual(self.client.cookies, {})
+
+    def test_stale_replica_reads_are_not_cached(self):
+        with replica_reads():
+            pin_user(self.user.pk)
+            self.assertFalse(cacheable_read(self.user.pk))
+            cache.delete(pin_key(self.user.pk))
+            self.assertTrue(cacheable_read(self.user.pk))
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, "primary")
+
+
+@mock.patch('users.models.send_verify_code.delay', new=mock.Mock())
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="secret-pass")
+        self.client.force_login(self.admin)
+        users = [User(username=f"user{i}", email=f"User{i}@Gmail.com", auth_type=choices.AuthTypeChoice.Email) for i in range(5)]
+        User.objects.bulk_create(users)
+        UserConfirmation.objects.bulk_create(
+            UserConfirmation(user=user, code="1234", verify_type=choices.AuthTypeChoice.Email) for user in users
+        )
+
+    def changelist(self, model, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/users/{model}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], [query['sql'] for query in queries]
+
+    def test_unfiltered_changelist_uses_estimated_count(self):
+        with mock.patch('utils.paginator.EstimatedCountPaginator.estimate_threshold', 1):
+            cl, queries = self.changelist('userconfirmation')
+        self.assertEqual(cl.result_count, 5)
+        self.assertIsNone(cl.full_result_count)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql])
+        self.assertTrue([sql for sql in queries if 'INNER JOIN "users_user"' in sql])
+
+    def test_search_hits_indexed_columns(self):
+        cl, queries = self.changelist('user', q=" user3@gmail.com ")
+        self.assertEqual([user.username for user in cl.result_list], ["user3"])
+        self.assertTrue([sql for sql in queries if 'LOWER("users_user"."email") =' in sql])
+
+        cl, _ = self.changelist('user', q="user")
+        self.assertEqual(cl.result_count, 5)
+
+        cl, _ = self.changelist('userconfirmation', q="user2")
+        self.assertEqual([item.user.username for item in cl.result_list], ["user2"])
+
+        UserConfirmation.objects.filter(user__username="user3").update(code="4321")
+        cl, _ = self.changelist('userconfirmation', q="4321")
+        self.assertEqual([item.user.username for item in cl.result_list], ["user3"])
+
+        cl, _ = self.changelist('user', q=str(User.objects.get(username="user1").pk))
+        self.assertEqual([user.username for user in cl.result_list], ["user1"])
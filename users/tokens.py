@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer as BaseTokenBlacklistSerializer,
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as BaseRefreshToken
+
+from utils.metrics import timer
+
+from .tasks import record_blacklisted_tokens, record_outstanding_tokens
+
+
+BLACKLIST_WARM_KEY = "jwt-blacklist:warm"
+
+
+def blacklist_key(jti):
+    return f"jwt-blacklist:{jti}"
+
+
+def warm_blacklist():
+    # cache bo'sh bo'lsa (restart, flush, boshqa process'ning LocMem'i) jadvaldagi amaldagi
+    # qora ro'yxat bir so'rovda cache'ga yuklanadi, keyingi tekshiruvlar SQL'siz o'tadi
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    jtis = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list('token__jti', flat=True)
+    batch = {}
+    for jti in jtis.iterator(chunk_size=2000):
+        batch[blacklist_key(jti)] = 1
+        if len(batch) >= 2000:
+            cache.set_many(batch, timeout)
+            batch = {}
+    if batch:
+        cache.set_many(batch, timeout)
+    cache.set(BLACKLIST_WARM_KEY, 1, settings.JWT_BLACKLIST_WARM_TTL)
+
+
+class RefreshToken(BaseRefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return super(BlacklistMixin, cls).for_user(user)
+
+    def _record(self, encoded=None):
+        return {
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+            'jti': self.payload[api_settings.JTI_CLAIM],
+            'token': encoded or str(self),
+            'iat': self.payload['iat'],
+            'exp': self.payload['exp'],
+        }
+
+    def outstand(self, encoded=None):
+        item = self._record(encoded)
+        transaction.on_commit(lambda: record_outstanding_tokens.delay([item]))
+
+    def _ttl(self):
+        return max(int(self.payload['exp'] - time.time()), 1)
+
+    def check_blacklist(self):
+        key = blacklist_key(self.payload[api_settings.JTI_CLAIM])
+        found = cache.get_many([key, BLACKLIST_WARM_KEY])
+        if key not in found and BLACKLIST_WARM_KEY not in found:
+            warm_blacklist()
+            found = cache.get_many([key])
+        if key in found:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        cache.set(blacklist_key(self.payload[api_settings.JTI_CLAIM]), 1, self._ttl())
+        if settings.JWT_BLACKLIST_WRITE_BEHIND:
+            item = self._record()
+            transaction.on_commit(lambda: record_blacklisted_tokens.delay([item]))
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class TokenBlacklistSerializer(BaseTokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
+def issue_tokens(user):
+    with timer('sign'):
+        refresh = RefreshToken.for_user(user)
+        refresh['auth_status'] = user.auth_status
+        refresh['auth_type'] = user.auth_type
+        refresh['is_premium'] = user.is_premium
+
+        encoded = str(refresh)
+        access = str(refresh.access_token)
+    refresh.outstand(encoded)
+    return {
+        'refresh': encoded,
+        'access': access,
+    }
@@ -0,0 +1,67 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from utils.routers import pin_user
+
+
+def version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def get_user_version(user_id):
+    version = cache.get(version_key(user_id))
+    if version is None:
+        version = bump_user_version(user_id)
+    return version
+
+
+def bump_user_version(user_id):
+    version = uuid4().hex
+    cache.set(version_key(user_id), version, None)
+    return version
+
+
+def profile_key(user_id):
+    return f"user-profile:{user_id}"
+
+
+def invalidate_user(user_id):
+    pin_user(user_id)
+    bump_user_version(user_id)
+    cache.delete(profile_key(user_id))
+
+
+class UserCache:
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            cached_version, expires, user = item
+            if cached_version != version or expires < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, version, user):
+        with self._lock:
+            self._items[user_id] = (version, time.monotonic() + self.ttl, copy.copy(user))
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
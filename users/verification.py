@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+MISS = 'miss'
+WRONG = 'wrong'
+EXPIRED = 'expired'
+OK = 'ok'
+
+
+def code_key(user_id):
+    return f"verify-code:{user_id}"
+
+
+def consumed_key(confirmation_id):
+    return f"verify-consumed:{confirmation_id}"
+
+
+def hash_code(user_id, code):
+    return salted_hmac('users.verification', f"{user_id}:{code}").hexdigest()
+
+
+def entry(confirmation):
+    expires = confirmation.expiration_time.timestamp()
+    return {
+        'hash': hash_code(confirmation.user_id, confirmation.code),
+        'id': str(confirmation.pk),
+        'expires': expires,
+    }
+
+
+def timeout(confirmation):
+    # muddati o'tgan kodga ham "eskirgan" javobi xotiradan berilishi uchun biroz ko'proq saqlanadi
+    remaining = confirmation.expiration_time - timezone.now()
+    return max(int(remaining.total_seconds()), 0) + settings.VERIFY_CODE_GRACE
+
+
+def remember(confirmation):
+    cache.set(code_key(confirmation.user_id), entry(confirmation), timeout(confirmation))
+
+
+def remember_many(confirmations):
+    if confirmations:
+        cache.set_many(
+            {code_key(c.user_id): entry(c) for c in confirmations},
+            max(timeout(c) for c in confirmations),
+        )
+
+
+def consume(confirmation_id):
+    # yozuv code_key'dan uzoqroq yashaydi, is_used bazaga yetib borguncha kod qayta ishlatilmaydi
+    return cache.add(consumed_key(confirmation_id), 1, settings.VERIFY_CODE_GRACE + 10 * 60)
+
+
+def check(user_id, code):
+    stored = cache.get(code_key(user_id))
+    if stored is None:
+        return MISS
+    if not constant_time_compare(stored['hash'], hash_code(user_id, code)):
+        return WRONG
+    if stored['expires'] < timezone.now().timestamp():
+        return EXPIRED
+    if not consume(stored['id']):
+        return WRONG
+
+    # cache jarayonlar orasida umumiy bo'lmasa ham (LocMem) kod ikki marta qabul qilinmaydi:
+    # is_used shartli UPDATE bilan shu yerning o'zida yoziladi
+    from .models import UserConfirmation
+    if not UserConfirmation.objects.mark_used(stored['id']):
+        return WRONG
+    return OK
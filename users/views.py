@@ -9,8 +9,11 @@ from rest_framework import status
 from . import choices
 from rest_framework.exceptions import ValidationError
 from .models import UserConfirmation
-from django.utils.timezone import now
-from datetime import timedelta
+from .ratelimit import new_verify_limiter
+from . import profile
+from django.utils.cache import get_conditional_response
+from .importer import READERS, import_users
+from rest_framework.parsers import MultiPartParser
 
 class SignUpView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -82,23 +85,14 @@ class GenerateNewVerifyView(APIView):
         if user.auth_status != choices.AuthStatusChoice.New:
             raise ValidationError("Akkaunt allaqachon tasdiqlangan")
         
-        one_minute_ago = now() - timedelta(minutes=1)
-        count_last_hour = UserConfirmation.objects.filter(
-            user=user,
-            created_at__gte=one_minute_ago
-        ).count()
-        
-        if count_last_hour > 1:
+        if not new_verify_limiter.hit(user.pk):
             raise ValidationError("Ko'p yuborayabsiz 1 minutda faqat bitta verification code yuboraman 1 minut kuting")
         
-        UserConfirmation.objects.create(
-            user = user, verify_type = user.auth_type
-        )
+        UserConfirmation.objects.issue(user)
         
         return Response(
             {
-                "message": "Emailga qarang kod yuborildi",
-                "token": user.token()
+                "message": "Emailga qarang kod yuborildi"
             }
         )
         
@@ -192,14 +186,10 @@ class LoginView(APIView):
     
     def post(self, request):
         if request.user.is_authenticated:
-            token = request.user.token()
             return Response(
                 {
                     "status": False,
-                    "message": "User is already logged in.",
-                    "data": {
-                        "token": token
-                    }
+                    "message": "User is already logged in."
                 }, status=400
             )
         ser = serializers.UserLoginSerializer(data=request.data)
@@ -227,6 +217,9 @@ class ProfileInfoView(APIView):
         ),
         tags=["User authentication"],
         responses={
+            304: openapi.Response(
+                description="Profil o'zgarmagan (If-None-Match / If-Modified-Since)"
+            ),
             200: openapi.Response(
                 description="Foydalanuvchi ma'lumotlari muvaffaqiyatli olindi",
                 schema=openapi.Schema(
@@ -253,10 +246,52 @@ class ProfileInfoView(APIView):
         }
     )
     def get(self, request):
-        ser = serializers.UserProfileSerializer(instance=request.user)
+        user = request.user
+        etag, last_modified = profile.profile_validators(user)
+        
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(
+                {
+                    "message": "Foydalanuvchi ma'lumotlari",
+                    "data": profile.profile_data(user, etag)
+                }
+            )
+        
+        return profile.set_validators(response, etag, last_modified)
+
+class ImportUsersView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    @swagger_auto_schema(
+        tags=["Admin"],
+        operation_description="CSV yoki JSONL fayldan foydalanuvchilarni import qilish (faqat admin).",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=sorted(READERS)),
+            openapi.Parameter('chunk_size', openapi.IN_FORM, type=openapi.TYPE_INTEGER),
+        ],
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError("Fayl yuborilmadi")
+        
+        fmt = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        if fmt not in READERS:
+            raise ValidationError("Format csv yoki jsonl bo'lishi kerak")
+        
+        try:
+            chunk_size = int(request.data.get('chunk_size', 1000))
+        except ValueError:
+            raise ValidationError("chunk_size butun son bo'lishi kerak")
+        
+        stats = import_users(upload, fmt, max(chunk_size, 1))
+        
         return Response(
             {
-                "message": "Foydalanuvchi ma'lumotlari",
-                "data": ser.data
-            }
-        )
\ No newline at end of file
+                "message": "Import tugadi",
+                "data": stats.as_dict()
+            }, status=status.HTTP_201_CREATED
+        )
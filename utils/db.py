@@ -0,0 +1,17 @@
+import time
+
+
+def delete_in_batches(queryset, batch_size=1000, order_by='pk'):
+    deleted = 0
+    started = time.perf_counter()
+    model = queryset.model
+    while True:
+        pks = list(queryset.order_by(order_by).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        count, _ = model._base_manager.filter(pk__in=pks).delete()
+        deleted += count
+        if len(pks) < batch_size:
+            break
+    elapsed = time.perf_counter() - started
+    return deleted, elapsed
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# METRICS_DIR'dagi process snapshot'i eng ko'pi bilan shuncha soniyada bir yangilanadi
+DUMP_INTERVAL = 1.0
+
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.timers = defaultdict(float)
+        self.cache = defaultdict(int)
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        parts = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"']
+        parts.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.timers.items())
+        if self.cache:
+            hits, misses = self.cache['hit'], self.cache['miss']
+            parts.append(f'cache;desc="hit={hits} miss={misses}"')
+        parts.append(f"total;dur={self.seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timer(name):
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timers[name] += time.perf_counter() - started
+
+
+def record_cache(cache_name, hit):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache['hit' if hit else 'miss'] += 1
+        registry.inc('cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+class Registry:
+    # directory berilsa (bir nechta gunicorn/uvicorn worker'i) har process o'z holatini
+    # <directory>/<pid>.json ga yozadi, render() esa barcha fayllarni qo'shib chiqaradi:
+    # scrape qaysi worker'ga tushmasin, counter'lar butun server bo'yicha bo'ladi
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._dumped = 0.0
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [[0] * len(DURATION_BUCKETS), 0, 0.0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def record_request(self, view, method, status, stats):
+        self.inc('http_requests_total', view=view, method=method, status=status)
+        self.observe('http_request_duration_seconds', stats.seconds, view=view)
+        self.inc('db_queries_total', stats.queries, view=view)
+        self.inc('db_query_seconds_total', stats.db_seconds, view=view)
+        for name, seconds in stats.timers.items():
+            self.inc(f'{name}_seconds_total', seconds, view=view)
+        if self.directory and time.monotonic() - self._dumped >= DUMP_INTERVAL:
+            self.dump()
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        if self.directory:
+            try:
+                os.remove(self.path())
+            except FileNotFoundError:
+                pass
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f"{pid or os.getpid()}.json")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, labels, [*buckets], count, total]
+                    for (name, labels), (buckets, count, total) in self._histograms.items()
+                ],
+            }
+
+    def dump(self):
+        self._dumped = time.monotonic()
+        path = self.path()
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.dump()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        counters = defaultdict(float)
+        histograms = {}
+        for snapshot in self.collect():
+            for name, labels, value in snapshot['counters']:
+                counters[name, tuple(map(tuple, labels))] += value
+            for name, labels, buckets, count, total in snapshot['histograms']:
+                histogram = histograms.setdefault((name, tuple(map(tuple, labels))), [[0] * len(DURATION_BUCKETS), 0, 0.0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+                histogram[1] += count
+                histogram[2] += total
+        counters = sorted(counters.items())
+        histograms = sorted(histograms.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels(labels)} {value:g}")
+        for (name, labels), (buckets, count, total) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', f'{bound:g}'),))} {value}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total:g}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = Registry()
@@ -0,0 +1,100 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+from .routers import pin_user, replica_reads
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        metrics.registry.directory = settings.METRICS_DIR
+
+        # execute_wrapper() faqat joriy thread ulanishiga ta'sir qiladi, async view'lar esa
+        # so'rovlarni sync_to_async thread'ida bajaradi. Shuning uchun wrapper har bir ulanishga
+        # bir marta qo'yiladi va so'rov kontekstidagi RequestStats ga yozadi.
+        connection_created.connect(install_query_wrapper, dispatch_uid='performance-query-wrapper')
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(None, connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        match = request.resolver_match
+        view = (match.view_name or match.route) if match else '<unresolved>'
+        metrics.registry.record_request(view, request.method, response.status_code, stats)
+        response['Server-Timing'] = stats.server_timing()
+        return response
+
+
+class PrimaryPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def pinned(self, request):
+        return request.method not in SAFE_METHODS or settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with replica_reads(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with replica_reads(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    def finish(self, request, response, state):
+        # yozuv replikaga yetib borguncha shu foydalanuvchining o'qishlari primary'da qoladi
+        if state.wrote:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_user(user.pk)
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
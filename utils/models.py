@@ -6,5 +6,15 @@ class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = list(update_fields)
+            # bo'sh update_fields Django'da hech narsa yozmaydi, shunday qolishi kerak
+            if update_fields and 'updated_at' not in update_fields:
+                update_fields.append('updated_at')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     class Meta:
         abstract = True
\ No newline at end of file
@@ -0,0 +1,82 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_state = ContextVar('replica_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    state = RequestState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin_user(user_id):
+    # cookie saqlamaydigan (Bearer token) klientlar uchun: pin umumiy cache'da foydalanuvchi bo'yicha turadi
+    if settings.DATABASE_REPLICAS and user_id is not None:
+        cache.set(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def _reads_replica(state):
+    return state is not None and not (state.pinned or state.wrote) and bool(settings.DATABASE_REPLICAS)
+
+
+def pin_reads_for(user_id):
+    state = _state.get()
+    if _reads_replica(state) and cache.get(pin_key(user_id)) is not None:
+        state.pinned = True
+
+
+async def apin_reads_for(user_id):
+    state = _state.get()
+    if _reads_replica(state) and await cache.aget(pin_key(user_id)) is not None:
+        state.pinned = True
+
+
+def cacheable_read(user_id):
+    # replikadan o'qilgan qator pin oynasida eskirgan bo'lishi mumkin, uni cache'ga yozmaymiz
+    return not _reads_replica(_state.get()) or cache.get(pin_key(user_id)) is None
+
+
+async def acacheable_read(user_id):
+    return not _reads_replica(_state.get()) or await cache.aget(pin_key(user_id)) is None
+
+
+class PrimaryReplicaRouter:
+    # Replikadan faqat so'rov ichida (PrimaryPinningMiddleware) va shu so'rov yoki oxirgi
+    # bir necha soniyada yozuv bo'lmagan bo'lsa o'qiladi. Yozadigan metodlar (POST, PATCH, ...),
+    # Celery va management command'lar doim primary'dan o'qiydi.
+    def db_for_read(self, model, **hints):
+        if not _reads_replica(_state.get()):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS